@@ -0,0 +1,136 @@
+"""Vectorized anomaly detectors for (series x days) count matrices.
+
+Every detector returns a threshold for each series and day, computed for
+all series at once; a day is anomalous when its count is above its
+threshold. Detectors:
+
+    iqr          Q3 + 1.5 * IQR of the whole series (the original fence)
+    zscore       mean + ZSCORE_LIMIT standard deviations of the whole series
+    rolling_mad  median + MAD_LIMIT * 1.4826 * MAD of the trailing ROLLING_WINDOW days
+    weekday      Q3 + 1.5 * IQR of the days sharing the same weekday
+
+A MAD of zero (common for sparse counts) is floored at one count, so a
+window of zeros does not flag every non-zero day.
+"""
+import os
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+DEFAULT_DETECTOR = os.environ.get("ANOMALY_DETECTOR", "iqr")
+ZSCORE_LIMIT = 3.0
+MAD_LIMIT = 3.5
+MAD_SCALE = 1.4826
+ROLLING_WINDOW = 28
+# Trailing windows are reduced this many days at a time to bound memory
+CHUNK_DAYS = 4096
+
+
+def iqr_fence(values, axis=-1):
+    # Missing leave counts are skipped like Series.quantile does; nanquantile is much slower, so only then
+    quantile = np.nanquantile if np.isnan(values).any() else np.quantile
+    q1, q3 = quantile(values, [0.25, 0.75], axis=axis)
+    return q3 + 1.5 * (q3 - q1)
+
+
+def iqr_thresholds(counts, calendar):
+    return np.broadcast_to(iqr_fence(counts, axis=1)[:, None], counts.shape)
+
+
+def zscore_thresholds(counts, calendar):
+    limit = counts.mean(axis=1) + ZSCORE_LIMIT * counts.std(axis=1)
+    return np.broadcast_to(limit[:, None], counts.shape)
+
+
+def sorted_median(block):
+    """Median along the last axis; sorting short windows beats np.median's per-row partition."""
+    ordered = np.sort(block, axis=-1)
+    n = ordered.shape[-1]
+    return (ordered[..., (n - 1) // 2] + ordered[..., n // 2]) / 2
+
+
+def rolling_mad_thresholds(counts, calendar, window=ROLLING_WINDOW):
+    """Median + MAD fence of each trailing window (fewer days at the start of the series)."""
+    n_series, n_days = counts.shape
+    window = min(window, n_days)
+    thresholds = np.empty((n_series, n_days))
+
+    def fence(block):
+        median = sorted_median(block)
+        mad = sorted_median(np.abs(block - median[..., None]))
+        return median + MAD_LIMIT * np.maximum(MAD_SCALE * mad, 1.0)
+
+    # Partial windows at the start of the series
+    for day in range(window - 1):
+        thresholds[:, day] = fence(counts[:, :day + 1])
+
+    windows = sliding_window_view(counts, window, axis=1)
+    for start in range(0, windows.shape[1], CHUNK_DAYS):
+        block = windows[:, start:start + CHUNK_DAYS]
+        thresholds[:, window - 1 + start:window - 1 + start + block.shape[1]] = fence(block)
+    return thresholds
+
+
+def weekday_thresholds(counts, calendar):
+    """IQR fence per series and weekday, computed over the days of that weekday."""
+    thresholds = np.empty(counts.shape)
+    for weekday in np.unique(calendar.weekday):
+        days = calendar.weekday == weekday
+        thresholds[:, days] = iqr_fence(counts[:, days], axis=1)[:, None]
+    return thresholds
+
+
+DETECTORS = {
+    "iqr": iqr_thresholds,
+    "zscore": zscore_thresholds,
+    "rolling_mad": rolling_mad_thresholds,
+    "weekday": weekday_thresholds,
+}
+# Detectors whose threshold is one value per series
+GLOBAL_DETECTORS = {"iqr", "zscore"}
+
+
+def check_detector(detector):
+    detector = detector or DEFAULT_DETECTOR
+    if detector not in DETECTORS:
+        raise ValueError(f"Unknown anomaly detector: {detector}")
+    return detector
+
+
+def detect(counts, calendar, detector=None):
+    """Returns (thresholds, anomalous mask) for every series and day."""
+    thresholds = DETECTORS[check_detector(detector)](counts, calendar)
+    return thresholds, counts > thresholds
+
+
+def anomaly_reports(counts, calendar, detector=None):
+    """One {"threshold", "anomalous_dates", "values"} dict per series.
+
+    Global detectors report their single threshold. Per-day detectors
+    report the lowest threshold of the period as "threshold" and add
+    "thresholds", the threshold of each anomalous date.
+    """
+    detector = check_detector(detector)
+    thresholds, anomalous = detect(counts, calendar, detector)
+    reports = []
+    for i in range(counts.shape[0]):
+        report = {
+            "threshold": thresholds[i, 0] if detector in GLOBAL_DETECTORS else thresholds[i].min(),
+            "anomalous_dates": calendar.date_strings[anomalous[i]].tolist(),
+            "values": counts[i][anomalous[i]].tolist(),
+        }
+        if detector not in GLOBAL_DETECTORS:
+            report["thresholds"] = thresholds[i][anomalous[i]].tolist()
+        reports.append(report)
+    return reports
+
+
+def leave_anomaly_reports(counts, calendar, detector=None):
+    """anomaly_reports in the {"dates", "values"} shape of the leave_trends anomalies section."""
+    reports = []
+    for report in anomaly_reports(counts, calendar, detector):
+        leave_report = {"dates": report["anomalous_dates"], "values": report["values"]}
+        if "thresholds" in report:
+            leave_report["thresholds"] = report["thresholds"]
+        reports.append(leave_report)
+    return reports
@@ -1,21 +1,133 @@
-from flask import Flask, request, jsonify
-from function import late_checkins, on_leave, non_checked_in, leave_trends
-from summary import generate_leave_summary, generate_late_checkin_summary,generate_non_checked_in_summary,generate_leave_trend_summary
+import os
+import time
+
+import threading
+
+from flask import Flask, Response, g, request, jsonify, stream_with_context
+from summary import summarize, with_summaries
+from cache import cache_from_env
+from lazy import lazy_import, preload
+import metrics
+
+# The analysis modules pull in NumPy; they load on first use unless preloaded
+function = lazy_import("function")
+incremental = lazy_import("incremental")
+batch = lazy_import("batch")
+streaming = lazy_import("streaming")
+columnar = lazy_import("columnar")
+rolling = lazy_import("rolling")
+rollups = lazy_import("rollups")
+shared_datasets = lazy_import("shared_datasets")
+anomalies = lazy_import("anomalies")
+serialization = lazy_import("serialization")
+cohorts = lazy_import("cohorts")
+
+ANALYSIS_MODULES = ["function", "incremental", "batch", "streaming", "columnar", "rolling", "rollups", "shared_datasets", "anomalies", "serialization", "cohorts", "leave_trends_numpy", "pandas"]
+
+# Set in a pre-fork master (see gunicorn.conf.py) so workers inherit loaded modules
+if os.environ.get("ANALYSIS_PRELOAD", "").lower() in ("1", "true", "yes"):
+    preload(*ANALYSIS_MODULES)
+
 app = Flask(__name__)
+result_cache = cache_from_env()
+_datasets = None
+_datasets_lock = threading.Lock()
+_rollup_store = None
+_shared = None
+
+
+def dataset_store():
+    global _datasets
+    with _datasets_lock:
+        if _datasets is None:
+            _datasets = incremental.DatasetStore()
+        return _datasets
+
+
+def rollup_store():
+    global _rollup_store
+    with _datasets_lock:
+        if _rollup_store is None:
+            _rollup_store = rollups.store_from_env()
+        return _rollup_store
+
+
+def shared_store():
+    global _shared
+    with _datasets_lock:
+        if _shared is None:
+            _shared = shared_datasets.SharedDatasets()
+        return _shared
+
+
+TIMING_HEADER = os.environ.get("ANALYSIS_TIMING_HEADER", "").lower() in ("1", "true", "yes")
+
+
+@app.before_request
+def start_timing():
+    if metrics.ENABLED:
+        g.metrics_token = metrics.start_request()
+        g.started = time.perf_counter()
+
+
+@app.after_request
+def record_timing(response):
+    token = g.pop("metrics_token", None)
+    if token is not None:
+        elapsed = time.perf_counter() - g.started
+        endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+        stages = metrics.finish_request(token, endpoint, response.status_code, elapsed, request.content_length)
+        if TIMING_HEADER or request.args.get("timing"):
+            response.headers["Server-Timing"] = metrics.server_timing(stages, elapsed)
+    return response
+
+
+def request_payload():
+    """Decodes the body: columnar formats by Content-Type, JSON otherwise."""
+    with metrics.stage("parse"):
+        reader = columnar.columnar_reader(request.mimetype)
+        if reader is None:
+            return request.get_json()
+        return reader(request.get_data())
+
 
+def columnar_body():
+    """Whether the body is in one of the columnar formats, which carry attendance counts only."""
+    return columnar.columnar_reader(request.mimetype) is not None
+
+
+def respond(result):
+    """Encodes a result in the requested layout, compressed if the client accepts it."""
+    with metrics.stage("serialize"):
+        try:
+            body, encoding = serialization.encode(
+                result, request.args.get("layout"), request.headers.get("Accept-Encoding")
+            )
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        response = Response(body, mimetype="application/json")
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+        response.vary.add("Accept-Encoding")
+        return response
 
 
 @app.route('/late_checkins', methods=['POST'])
 def analyze_late_checkins():
     try:
-        data = request.get_json()
+        data = request_payload()
         if not data:
             return jsonify({"error": "No JSON data received"}), 400
 
-        analysis_result = late_checkins(data)
-        final_summary = generate_late_checkin_summary(analysis_result)
+        detector, error = requested_detector()
+        if error:
+            return error
 
-        return jsonify(final_summary)
+        final_summary = result_cache.get_or_compute(
+            'late_checkins', data, lambda: summarize('late_checkins', function.late_checkins(data, detector)), detector=detector
+        )
+
+        return respond(final_summary)
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500    
@@ -23,14 +135,19 @@ def analyze_late_checkins():
 @app.route('/on_leave', methods=['POST'])
 def analyze_on_leave():
     try:
-        data = request.get_json()
+        data = request_payload()
         if not data:
             return jsonify({"error": "No JSON data received"}), 400
 
-        analysis_result = on_leave(data)
-        final_summary = generate_leave_summary(analysis_result)
+        detector, error = requested_detector()
+        if error:
+            return error
+
+        final_summary = result_cache.get_or_compute(
+            'on_leave', data, lambda: summarize('on_leave', function.on_leave(data, detector)), detector=detector
+        )
 
-        return jsonify(final_summary)
+        return respond(final_summary)
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500    
@@ -39,13 +156,37 @@ def analyze_on_leave():
 @app.route('/non_checked_in', methods=['POST'])
 def analyze_non_checked_in():
     try:
-        data = request.get_json()
+        data = request_payload()
         if not data:
             return jsonify({"error": "No JSON data received"}), 400
 
-        analysis_result = non_checked_in(data)
-        final_summary = generate_non_checked_in_summary(analysis_result)
-        return jsonify(final_summary)
+        detector, error = requested_detector()
+        if error:
+            return error
+
+        final_summary = result_cache.get_or_compute(
+            'non_checked_in', data, lambda: summarize('non_checked_in', function.non_checked_in(data, detector)), detector=detector
+        )
+        return respond(final_summary)
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500 
+
+@app.route('/no_record', methods=['POST'])
+def analyze_no_record():
+    try:
+        data = request_payload()
+        if not data:
+            return jsonify({"error": "No JSON data received"}), 400
+
+        detector, error = requested_detector()
+        if error:
+            return error
+
+        final_summary = result_cache.get_or_compute(
+            'no_record', data, lambda: summarize('no_record', function.no_record(data, detector)), detector=detector
+        )
+        return respond(final_summary)
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500 
@@ -53,15 +194,373 @@ def analyze_non_checked_in():
 @app.route('/leave_trends', methods=['POST'])
 def analyze_leave_trends():
     try:
-        data = request.get_json()
+        if columnar_body():
+            return jsonify({"error": "Columnar bodies carry attendance counts only; send leave trends as JSON"}), 415
+        data = request_payload()
+        if not data:
+            return jsonify({"error": "No JSON data received"}), 400
+
+        engine = request.args.get("engine")
+        if engine and engine not in function.LEAVE_TRENDS_ENGINES:
+            return jsonify({"error": f"Unknown engine: {engine}"}), 400
+
+        detector, error = requested_detector()
+        if error:
+            return error
+
+        # Both engines return the same result, so they share cache entries
+        final_summary = result_cache.get_or_compute(
+            'leave_trends', data, lambda: summarize('leave_trends', function.leave_trends(data, engine, detector)),
+            detector=detector,
+        )
+        return respond(final_summary)
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500 
+
+
+def requested_sections(data):
+    """Reads the optional section subset from ?sections=a,b or the payload's "sections" list."""
+    sections = request.args.get("sections")
+    if sections:
+        return [section.strip() for section in sections.split(",") if section.strip()]
+    return data.get("sections")
+
+
+def unknown_sections_error(sections):
+    """A 400 response naming the requested sections that do not exist, or None if all do."""
+    unknown = [section for section in sections or [] if section not in function.ALL_SECTIONS]
+    if unknown:
+        return jsonify({"error": f"Unknown sections: {', '.join(unknown)}"}), 400
+    return None
+
+
+def requested_detector():
+    """The ?detector= name, with a 400 response if it is not a known anomaly detector (else None)."""
+    detector = request.args.get("detector")
+    if detector and detector not in anomalies.DETECTORS:
+        return detector, (jsonify({"error": f"Unknown anomaly detector: {detector}"}), 400)
+    return detector, None
+
+
+def combined_analysis(data, sections, engine=None, detector=None):
+    return with_summaries(function.analyze(data, sections, engine, detector))
+
+
+@app.route('/analyze', methods=['POST'])
+def analyze_all():
+    try:
+        data = request_payload()
         if not data:
             return jsonify({"error": "No JSON data received"}), 400
 
-        analysis_result = leave_trends(data)
-        final_summary = generate_leave_trend_summary(analysis_result)
-        return jsonify(final_summary)
+        sections = requested_sections(data)
+        engine = request.args.get("engine")
+        if engine and engine not in function.LEAVE_TRENDS_ENGINES:
+            return jsonify({"error": f"Unknown engine: {engine}"}), 400
+
+        detector, error = requested_detector()
+        if error:
+            return error
+
+        try:
+            combined = result_cache.get_or_compute(
+                'analyze', data, lambda: combined_analysis(data, sections, engine, detector),
+                sections=sections, detector=detector,
+            )
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        return respond(combined)
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500 
+
+@app.route('/rolling', methods=['POST'])
+def analyze_rolling():
+    try:
+        data = request_payload()
+        if not data:
+            return jsonify({"error": "No JSON data received"}), 400
+
+        windows = request.args.get("windows")
+        try:
+            windows = [int(w) for w in windows.split(",") if w.strip()] if windows else data.get("windows")
+        except ValueError:
+            return jsonify({"error": f"Invalid windows: {request.args['windows']}"}), 400
+        sections = requested_sections(data)
+
+        try:
+            result = result_cache.get_or_compute(
+                'rolling', data, lambda: rolling.rolling_analysis(data, windows, sections),
+                windows=windows, sections=sections,
+            )
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        return respond(result)
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/batch', methods=['POST'])
+def analyze_hostels():
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({"error": "No JSON data received"}), 400
+
+        hostels = data.get("hostels")
+        if not isinstance(hostels, dict) or not hostels:
+            return jsonify({"error": "Expected a non-empty 'hostels' object of hostel_id -> payload"}), 400
+
+        sections = requested_sections(data)
+        error = unknown_sections_error(sections)
+        if error:
+            return error
+
+        detector, error = requested_detector()
+        if error:
+            return error
+
+        workers = request.args.get("workers", type=int)
+        return respond(batch.analyze_batch(hostels, sections, workers=workers, detector=detector))
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/cohorts', methods=['POST'])
+def analyze_cohorts():
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({"error": "No JSON data received"}), 400
+
+        sections = requested_sections(data)
+        error = unknown_sections_error(sections)
+        if error:
+            return error
+
+        detector, error = requested_detector()
+        if error:
+            return error
+
+        group_by = request.args.get("group_by")
+        group_by = [key.strip() for key in group_by.split(",") if key.strip()] if group_by else data.get("group_by")
+
+        try:
+            result = result_cache.get_or_compute(
+                'cohorts', data, lambda: cohorts.cohort_analysis(data, group_by, sections, detector),
+                group_by=group_by, sections=sections, detector=detector,
+            )
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        return respond(result)
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/stream', methods=['POST'])
+def analyze_stream():
+    sections = requested_sections({})
+    error = unknown_sections_error(sections)
+    if error:
+        return error
+
+    grouped = request.args.get("grouped", "").lower() in ("1", "true", "yes")
+    results = streaming.stream_analysis(request.stream, sections, grouped)
+    return Response(stream_with_context(streaming.encode_ndjson(results)), mimetype="application/x-ndjson")
+
+
+@app.route('/datasets', methods=['POST'])
+def create_dataset():
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({"error": "No JSON data received"}), 400
+
+        try:
+            dataset_id, dataset = dataset_store().create(data)
+        except (KeyError, ValueError) as e:
+            return jsonify({"error": str(e)}), 400
+
+        return jsonify({"dataset_id": dataset_id, "sections": dataset.sections, "days": len(dataset)}), 201
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/datasets/<dataset_id>/days', methods=['POST'])
+def append_dataset_days(dataset_id):
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({"error": "No JSON data received"}), 400
+
+        try:
+            result = dataset_store().append(dataset_id, data.get("data", data))
+        except (KeyError, TypeError, ValueError) as e:
+            return jsonify({"error": str(e)}), 400
+        if result is None:
+            return jsonify({"error": "Dataset not found"}), 404
+
+        appended, dataset = result
+        return jsonify({"dataset_id": dataset_id, "appended": appended, "days": len(dataset)})
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/datasets/<dataset_id>/analysis', methods=['GET'])
+def dataset_analysis(dataset_id):
+    try:
+        dataset = dataset_store().get(dataset_id)
+        if dataset is None:
+            return jsonify({"error": "Dataset not found"}), 404
+
+        try:
+            analysis_result = dataset.analysis(requested_sections({}))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        return respond(with_summaries(analysis_result))
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/datasets/<dataset_id>', methods=['DELETE'])
+def delete_dataset(dataset_id):
+    if not dataset_store().delete(dataset_id):
+        return jsonify({"error": "Dataset not found"}), 404
+    return '', 204
+
+
+@app.route('/shared', methods=['POST'])
+def register_shared_dataset():
+    try:
+        data = request_payload()
+        if not data:
+            return jsonify({"error": "No JSON data received"}), 400
+
+        try:
+            dataset_id = shared_store().register(data)
+        except (KeyError, ValueError) as e:
+            return jsonify({"error": str(e)}), 400
+
+        dataset = shared_store().get(dataset_id)
+        return jsonify({"dataset_id": dataset_id, "sections": dataset.sections, "days": len(dataset)}), 201
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+def shared_summary(dataset, section, detector=None):
+    analysis_result = dataset.analysis([section], detector)[section]
+    if "error" in analysis_result:
+        raise ValueError(analysis_result["error"])
+    return summarize(section, analysis_result)
+
+
+@app.route('/shared/<dataset_id>/<section>', methods=['GET'])
+def shared_dataset_analysis(dataset_id, section):
+    try:
+        dataset = shared_store().get(dataset_id)
+        if dataset is None:
+            return jsonify({"error": "Dataset not found"}), 404
+
+        detector, error = requested_detector()
+        if error:
+            return error
+
+        if section == "analyze":
+            sections = requested_sections({})
+            error = unknown_sections_error(sections)
+            if error:
+                return error
+            # Dataset ids are content hashes, so they are safe cache keys
+            return respond(result_cache.get_or_compute(
+                'shared.analyze', {"dataset": dataset_id}, lambda: with_summaries(dataset.analysis(sections, detector)),
+                sections=sections, detector=detector,
+            ))
+
+        if section not in function.ALL_SECTIONS:
+            return jsonify({"error": f"Unknown section: {section}"}), 404
+
+        try:
+            final_summary = result_cache.get_or_compute(
+                f'shared.{section}', {"dataset": dataset_id}, lambda: shared_summary(dataset, section, detector),
+                detector=detector,
+            )
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        return respond(final_summary)
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/shared/<dataset_id>', methods=['DELETE'])
+def delete_shared_dataset(dataset_id):
+    if not shared_store().delete(dataset_id):
+        return jsonify({"error": "Dataset not found"}), 404
+    return '', 204
+
+
+@app.route('/rollups/<hostel_id>', methods=['POST'])
+def ingest_rollups(hostel_id):
+    try:
+        data = request_payload()
+        if not data:
+            return jsonify({"error": "No JSON data received"}), 400
+
+        try:
+            ingested = rollup_store().ingest(hostel_id, data)
+        except (KeyError, ValueError) as e:
+            return jsonify({"error": str(e)}), 400
+
+        return jsonify(ingested)
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/rollups/<hostel_id>', methods=['GET'])
+def query_rollups(hostel_id):
+    try:
+        try:
+            result = rollup_store().query(
+                hostel_id, requested_sections({}), request.args.get("start"), request.args.get("end")
+            )
+        except KeyError:
+            return jsonify({"error": "Hostel not found"}), 404
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        return respond(result)
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    stats = result_cache.stats()
+    extra = {
+        "analysis_cache_hits_total": ("counter", "Result cache hits in this worker.", stats["hits"]),
+        "analysis_cache_backend_hits_total": ("counter", "Result cache hits served by the shared backend.", stats["backend_hits"]),
+        "analysis_cache_misses_total": ("counter", "Result cache misses in this worker.", stats["misses"]),
+        "analysis_cache_entries": ("gauge", "Entries in this worker's result cache.", stats["entries"]),
+        "analysis_metrics_enabled": ("gauge", "1 when stage metrics are being recorded.", int(metrics.ENABLED)),
+    }
+    return Response(metrics.render(extra), mimetype="text/plain; version=0.0.4")
+
+
+@app.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    return jsonify(result_cache.stats())
+
 if __name__ == '__main__':
     app.run(debug=True,port=3000)
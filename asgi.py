@@ -0,0 +1,412 @@
+"""ASGI entry point for production serving.
+
+    uvicorn asgi:app --workers 4
+
+Request bodies are read asynchronously on the event loop. The Flask app then
+runs in a bounded thread pool, so the CPU-bound analyses never block the
+loop. Load is limited at admission: once ASGI_MAX_PENDING requests are
+queued or running, new ones get an immediate 503 with Retry-After. A request
+that exceeds ASGI_TIMEOUT seconds gets a 504. If its analysis has not started
+yet it is cancelled; one that is already running finishes in the background
+and its result is dropped, because Python threads cannot be interrupted.
+If the deadline passes while a response body is still being produced, the
+connection is aborted so the client never sees a truncated 200.
+
+With ASGI_EXECUTOR=process each request instead runs in one of ASGI_WORKERS
+forked analysis processes, and a timed-out analysis is killed with its
+process, which is then replaced. Responses are buffered whole in this mode
+(including /stream), and in-memory state such as /metrics counters is kept
+per process.
+
+On lifespan startup every analysis module (NumPy and pandas included) is
+imported and a small dummy payload is analyzed with both leave_trends
+engines, so the first real request is not slow.
+
+Settings: ASGI_WORKERS (default: CPU count), ASGI_MAX_PENDING (default:
+4 x workers), ASGI_TIMEOUT (default: 30 seconds), ASGI_WARMUP (default: 1),
+ASGI_EXECUTOR (thread or process, default: thread).
+"""
+import asyncio
+import contextvars
+import io
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+WORKERS = int(os.environ.get("ASGI_WORKERS", os.cpu_count() or 1))
+MAX_PENDING = int(os.environ.get("ASGI_MAX_PENDING", WORKERS * 4))
+TIMEOUT = float(os.environ.get("ASGI_TIMEOUT", 30))
+WARMUP = os.environ.get("ASGI_WARMUP", "1").lower() not in ("0", "false", "no")
+EXECUTOR = os.environ.get("ASGI_EXECUTOR", "thread")
+EXECUTORS = ["thread", "process"]
+
+# Sentinel returned by the body iterator once the WSGI response is exhausted
+_DONE = object()
+
+
+def warmup_payload(days=14):
+    labels = [f"2025-01-{day:02d}" for day in range(1, days + 1)]
+    counts = [day % 3 for day in range(days)]
+    return {"data": {
+        "labels": labels,
+        "late_checked_in": counts,
+        "on_leave": counts,
+        "non_checked_in": counts,
+        "no_record": counts,
+        "plannedUnplannedLeavesTrends": [
+            {"date": label, "urgent_count": "1", "planned_count": str(count), "total_leaves": 1 + count,
+             "urgent_percentage": f"{100 / (1 + count):.2f}", "planned_percentage": f"{100 * count / (1 + count):.2f}"}
+            for label, count in zip(labels, counts)
+        ],
+    }}
+
+
+class AnalysisASGI:
+    """Serves a WSGI app over ASGI with a bounded executor, load shedding and timeouts."""
+
+    def __init__(self, wsgi_app=None, workers=WORKERS, max_pending=MAX_PENDING, timeout=TIMEOUT, warmup=WARMUP,
+                 executor=EXECUTOR):
+        if executor not in EXECUTORS:
+            raise ValueError(f"Unknown ASGI executor: {executor}")
+        self._wsgi_app = wsgi_app
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.warmup = warmup
+        self.use_processes = executor == "process"
+        # In process mode these threads only wait on the analysis processes
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="analysis")
+        self.processes = []
+        self.idle = None
+        self.pending = 0
+        self._lock = threading.Lock()
+        self.rejected = 0
+        self.timed_out = 0
+
+    @property
+    def wsgi_app(self):
+        if self._wsgi_app is None:
+            from app import app
+            self._wsgi_app = app
+        return self._wsgi_app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self.lifespan(receive, send)
+        elif scope["type"] == "http":
+            await self.http(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    if self.warmup:
+                        await asyncio.get_running_loop().run_in_executor(self.executor, self.run_warmup)
+                    if self.use_processes:
+                        # Forked after the warm-up, so every process starts warm
+                        self.start_processes()
+                except Exception as e:
+                    await send({"type": "lifespan.startup.failed", "message": str(e)})
+                    return
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.executor.shutdown(wait=False, cancel_futures=True)
+                for process in self.processes:
+                    process.stop()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    def run_warmup(self):
+        """Imports the analysis stack and runs one dummy analysis; returns the seconds taken.
+
+        The analysis is called directly rather than through /analyze, so the
+        dummy payload never touches the result cache, which other workers
+        may share.
+        """
+        start = time.perf_counter()
+        # Every module, including pandas, which the default NumPy engine and ISO labels never load
+        from app import ANALYSIS_MODULES
+        from lazy import preload
+
+        preload(*ANALYSIS_MODULES)
+        import numpy as np
+        from function import analyze, leave_trends
+        from serialization import dumps
+        from summary import with_summaries
+
+        payload = warmup_payload()
+        results = with_summaries(analyze(payload))
+        errors = [section for section, result in results.items() if "error" in result["analysis"]]
+        if errors:
+            raise RuntimeError(f"Warm-up analysis failed for {', '.join(errors)}")
+        dumps(results)
+        with np.errstate(all="ignore"):
+            leave_trends(payload, "pandas")
+        return time.perf_counter() - start
+
+    async def http(self, scope, receive, send):
+        # Shed load before reading the body so an overloaded worker stays cheap
+        if not self.acquire():
+            self.rejected += 1
+            await send_simple(send, 503, b'{"error": "Server busy, retry shortly"}', [(b"retry-after", b"1")])
+            return
+
+        release = True
+        try:
+            body = await read_body(receive)
+            environ = wsgi_environ(scope, body)
+            if self.use_processes:
+                await self.respond_from_process(environ, send)
+            else:
+                release = await self.respond_from_thread(environ, send)
+        finally:
+            if release:
+                self.release()
+
+    async def respond_from_thread(self, environ, send):
+        """Runs the request in the thread pool; returns False if the still-running work keeps its slot."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout
+
+        work = self.executor.submit(call_wsgi, self.wsgi_app, environ)
+        try:
+            status, headers, chunks = await asyncio.wait_for(asyncio.wrap_future(work), self.timeout)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            # A queued analysis was cancelled; a running one keeps its slot until it finishes
+            work.add_done_callback(lambda _: self.release())
+            await send_simple(send, 504, b'{"error": "Analysis timed out"}')
+            return False
+
+        close = chunks.close
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        while True:
+            remaining = max(deadline - loop.time(), 0)
+            pending = loop.run_in_executor(self.executor, next, chunks, _DONE)
+            try:
+                chunk = await asyncio.wait_for(asyncio.shield(pending), remaining)
+            except asyncio.TimeoutError:
+                self.timed_out += 1
+                # The body iterator can only be closed once its current chunk is done
+                pending.add_done_callback(lambda _: close())
+                # The status line is already out: abort the connection instead of ending a truncated body
+                raise TimeoutError("Analysis response timed out mid-body")
+            if chunk is _DONE:
+                break
+            if chunk:
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        close()
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+        return True
+
+    async def respond_from_process(self, environ, send):
+        """Runs the request in an idle analysis process, killing it if the request times out."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout
+        self.start_processes()
+        try:
+            process = await asyncio.wait_for(self.idle.get(), self.timeout)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            await send_simple(send, 504, b'{"error": "Analysis timed out"}')
+            return
+
+        try:
+            status, headers, body = await asyncio.wait_for(
+                loop.run_in_executor(self.executor, process.call, environ), max(deadline - loop.time(), 0)
+            )
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            process.restart()
+            await send_simple(send, 504, b'{"error": "Analysis timed out"}')
+            return
+        except Exception:
+            if process.conn.closed:
+                process.restart()
+            raise
+        finally:
+            self.idle.put_nowait(process)
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+    def start_processes(self):
+        if self.idle is None:
+            self.idle = asyncio.Queue()
+            self.processes = [AnalysisProcess(self.wsgi_app) for _ in range(self.workers)]
+            for process in self.processes:
+                self.idle.put_nowait(process)
+
+    def acquire(self):
+        with self._lock:
+            if self.pending >= self.max_pending:
+                return False
+            self.pending += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self.pending -= 1
+
+
+class AnalysisProcess:
+    """A forked process that serves one WSGI request at a time over a pipe."""
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+        self.start()
+
+    def start(self):
+        self.conn, child = multiprocessing.Pipe()
+        self.process = multiprocessing.get_context("fork").Process(
+            target=serve_wsgi, args=(self.wsgi_app, child), name="analysis", daemon=True,
+        )
+        self.process.start()
+        child.close()
+
+    def call(self, environ):
+        """Sends one request and blocks until its (status, headers, body) comes back."""
+        conn = self.conn
+        environ = {key: value for key, value in environ.items() if key != "wsgi.errors"}
+        try:
+            conn.send(environ)
+            result = conn.recv()
+        except (EOFError, OSError):
+            # The process was killed (timed out) or crashed
+            conn.close()
+            raise RuntimeError("Analysis process exited")
+        if isinstance(result, BaseException):
+            raise result
+        return result
+
+    def restart(self):
+        self.stop()
+        self.start()
+
+    def stop(self):
+        # The pipe is closed by the thread blocked on it, once the kill makes recv fail
+        self.process.kill()
+        self.process.join()
+
+
+def serve_wsgi(wsgi_app, conn):
+    # Ctrl+C is for the server process, which stops this one
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    while True:
+        try:
+            environ = conn.recv()
+        except EOFError:
+            return
+        environ["wsgi.errors"] = sys.stderr
+        try:
+            status, headers, chunks = call_wsgi(wsgi_app, environ)
+            try:
+                body = b"".join(chunks)
+            finally:
+                chunks.close()
+            conn.send((status, headers, body))
+        except Exception as e:
+            conn.send(e)
+
+
+async def read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body"):
+            return b"".join(chunks)
+
+
+async def send_simple(send, status, body, extra_headers=()):
+    headers = [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+    await send({"type": "http.response.start", "status": status, "headers": headers + list(extra_headers)})
+    await send({"type": "http.response.body", "body": body})
+
+
+def wsgi_environ(scope, body):
+    server = scope.get("server") or ("localhost", 80)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", ""),
+        "PATH_INFO": scope["path"],
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": str(server[0]),
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "CONTENT_LENGTH": str(len(body)),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    if scope.get("client"):
+        environ["REMOTE_ADDR"] = scope["client"][0]
+    for name, value in scope.get("headers", []):
+        name = name.decode("latin-1").upper().replace("-", "_")
+        value = value.decode("latin-1")
+        if name == "CONTENT_TYPE":
+            environ["CONTENT_TYPE"] = value
+        elif name != "CONTENT_LENGTH":
+            key = f"HTTP_{name}"
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+def call_wsgi(wsgi_app, environ):
+    """Runs the WSGI app up to its first body chunk; returns (status, headers, body iterator).
+
+    The app runs in a fresh context that the body iterator re-enters for
+    every chunk, because its chunks are read on whichever executor thread is
+    free and stream_with_context responses need the request context they
+    pushed.
+    """
+    context = contextvars.copy_context()
+    response = {}
+
+    def start_response(status, headers, exc_info=None):
+        response["status"] = int(status.split(" ", 1)[0])
+        response["headers"] = [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers]
+
+    iterable = context.run(wsgi_app, environ, start_response)
+    chunks = iter(iterable)
+    first = context.run(next, chunks, _DONE)
+    if first is _DONE:
+        rest = iter(())
+    else:
+        rest = prepend(first, chunks)
+    return response["status"], response["headers"], ContextIterator(rest, getattr(iterable, "close", None), context)
+
+
+def prepend(first, chunks):
+    yield first
+    yield from chunks
+
+
+class ContextIterator:
+    """Reads (and closes) a WSGI body inside the context the request started in."""
+
+    def __init__(self, iterator, close, context):
+        self.iterator = iterator
+        self._close = close
+        self.context = context
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return self.context.run(next, self.iterator)
+
+    def close(self):
+        if self._close is not None:
+            self.context.run(self._close)
+
+
+app = AnalysisASGI()
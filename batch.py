@@ -0,0 +1,83 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from function import analyze
+from summary import with_summaries
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def batch_workers():
+    """Worker count from BATCH_WORKERS, defaulting to the CPU count."""
+    return int(os.environ.get("BATCH_WORKERS", os.cpu_count() or 1))
+
+
+def batch_chunk_size():
+    return int(os.environ.get("BATCH_CHUNK_SIZE", 4))
+
+
+def get_pool():
+    """Returns the shared process pool of batch_workers() processes.
+
+    The pool is first needed during a request, inside a threaded server, where
+    forking could copy a lock another thread holds. Its workers come from a
+    forkserver instead, which imports this module once and forks them warm.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            context = multiprocessing.get_context("forkserver")
+            context.set_forkserver_preload([__name__])
+            _pool = ProcessPoolExecutor(max_workers=batch_workers(), mp_context=context)
+        return _pool
+
+
+def reset_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def analyze_item(item):
+    """Analyzes one (key, payload, sections, detector) item; failures stay local to the item."""
+    key, data, sections, detector = item
+    try:
+        if not isinstance(data, dict) or "data" not in data:
+            raise ValueError("Expected a data.json-shaped payload")
+        return key, with_summaries(analyze(data, sections, detector=detector))
+    except Exception as e:
+        return key, {"error": str(e)}
+
+
+def analyze_batch(payloads, sections=None, workers=None, chunksize=None, detector=None):
+    """Analyzes {key: payload} across a process pool and returns {key: result}.
+
+    `workers` can only lower the pool's batch_workers() processes. A payload
+    that fails only turns its own entry into {"error": ...}.
+    """
+    workers = batch_workers() if workers is None else min(workers, batch_workers())
+    chunksize = batch_chunk_size() if chunksize is None else chunksize
+    items = [(key, data, sections, detector) for key, data in payloads.items()]
+
+    if workers <= 1 or len(items) <= 1:
+        return dict(map(analyze_item, items))
+
+    # With fewer workers than the pool has, at most `workers` chunks are handed out
+    if workers < batch_workers():
+        chunksize = max(chunksize, -(-len(items) // workers))
+    results = {}
+    try:
+        for key, result in get_pool().map(analyze_item, items, chunksize=max(chunksize, 1)):
+            results[key] = result
+    except BrokenProcessPool as e:
+        # A crashed worker takes its chunk with it; report the rest instead of failing the batch
+        reset_pool()
+        for key, _, _, _ in items:
+            results.setdefault(key, {"error": f"Worker process failed: {e}"})
+    return results
@@ -0,0 +1,34 @@
+"""Runs the micro-benchmarks and the load test and writes one JSON result file.
+
+Usage: python -m benchmarks [--output bench.json] [--quick]
+
+Compare two runs with python -m benchmarks.compare old.json new.json.
+"""
+import argparse
+import json
+
+from benchmarks import load, micro
+from benchmarks.timing import environment
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--quick", action="store_true", help="Smaller histories and fewer requests")
+    args = parser.parse_args(argv)
+
+    days = [90, 365] if args.quick else [90, 365, 3650]
+    requests = 100 if args.quick else 500
+    results = {
+        "environment": environment(),
+        "micro": micro.run(days, repeat=5 if args.quick else 20),
+        "load": load.run(load.ENDPOINTS[:5], requests, concurrency=8, days=90, tenants=20),
+    }
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Wrote {args.output}: {len(results['micro'])} micro-benchmarks, "
+          f"load test {results['load']['overall']['throughput_rps']} req/s")
+
+
+if __name__ == "__main__":
+    main()
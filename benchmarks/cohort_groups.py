@@ -0,0 +1,81 @@
+"""Compares one grouped /cohorts pass with analyzing every group as its own payload.
+
+Usage: python -m benchmarks.cohort_groups [--groups 10 100 500] [--days 365] [--repeat 3]
+
+Records are long-format (one per group and day, with every attendance
+metric and urgent/planned counts). "per_group" builds a data.json payload
+for each group and runs analyze plus summaries on it, as one request per
+group would; it excludes the HTTP and encoding cost of those requests.
+"""
+import argparse
+
+import numpy as np
+
+from cohorts import cohort_analysis
+from function import analyze
+from summary import with_summaries
+from benchmarks.timing import time_calls
+
+METRICS = ["late_checked_in", "on_leave", "non_checked_in", "urgent_count", "planned_count"]
+SECTIONS = ["late_checkins", "on_leave", "non_checked_in", "leave_trends"]
+
+
+def cohort_columns(groups, days, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = np.arange(np.datetime64("2024-01-01"), np.datetime64("2024-01-01") + days).astype(str)
+    columns = {
+        "date": np.tile(dates, groups).tolist(),
+        "block": np.repeat([f"B{i % 20}" for i in range(groups)], days).tolist(),
+        "year": np.repeat([i // 20 for i in range(groups)], days).tolist(),
+    }
+    for metric in METRICS:
+        columns[metric] = rng.poisson(2, groups * days).tolist()
+    return columns
+
+
+def per_group(columns, groups, days):
+    results = []
+    for g in range(groups):
+        rows = slice(g * days, (g + 1) * days)
+        labels = columns["date"][rows]
+        urgent, planned = columns["urgent_count"][rows], columns["planned_count"][rows]
+        payload = {"data": {
+            "labels": labels,
+            **{metric: columns[metric][rows] for metric in METRICS[:3]},
+            "plannedUnplannedLeavesTrends": [
+                {
+                    "date": date, "urgent_count": u, "planned_count": p, "total_leaves": u + p,
+                    "urgent_percentage": round(u / (u + p) * 100, 2), "planned_percentage": round(p / (u + p) * 100, 2),
+                }
+                for date, u, p in zip(labels, urgent, planned) if u + p
+            ],
+        }}
+        results.append(with_summaries(analyze(payload, SECTIONS)))
+    return results
+
+
+def run(groups_list, days, repeat):
+    rows = []
+    for groups in groups_list:
+        columns = cohort_columns(groups, days)
+        data = {"group_by": ["block", "year"], "records": columns}
+        with np.errstate(all="ignore"):
+            for mode, fn in (("cohorts", lambda: cohort_analysis(data)), ("per_group", lambda: per_group(columns, groups, days))):
+                rows.append({"mode": mode, "groups": groups, **time_calls(fn, repeat)})
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--groups", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    print(f"{'mode':>10} {'groups':>7} {'p50 ms':>9}")
+    for row in run(args.groups, args.days, args.repeat):
+        print(f"{row['mode']:>10} {row['groups']:>7} {row['p50_ms']:>9}")
+
+
+if __name__ == "__main__":
+    main()
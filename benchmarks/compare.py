@@ -0,0 +1,61 @@
+"""Compares two benchmark result files and flags regressions.
+
+Usage: python -m benchmarks.compare baseline.json current.json [--metric p50_ms] [--threshold 10]
+
+Exits with status 1 when any shared benchmark got slower by more than the
+threshold (in percent).
+"""
+import argparse
+import json
+import sys
+
+
+def flatten(results):
+    """Maps a result file to {benchmark name: metrics}."""
+    rows = {}
+    for row in results.get("micro", []):
+        rows[f"micro/{row['benchmark']}/{row['days']}d"] = row
+    load = results.get("load")
+    if load:
+        rows["load/overall"] = load["overall"]
+        for endpoint, row in load["endpoints"].items():
+            rows[f"load/{endpoint}"] = row
+    return rows
+
+
+def compare(baseline, current, metric="p50_ms", threshold=10.0):
+    before, after = flatten(baseline), flatten(current)
+    rows = []
+    for name in sorted(before.keys() & after.keys()):
+        old, new = before[name].get(metric), after[name].get(metric)
+        if not old or new is None:
+            continue
+        change = (new - old) / old * 100
+        rows.append({"benchmark": name, "before": old, "after": new, "change_pct": round(change, 1), "regression": change > threshold})
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--metric", default="p50_ms")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Allowed slowdown in percent")
+    args = parser.parse_args(argv)
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+
+    rows = compare(baseline, current, args.metric, args.threshold)
+    print(f"{baseline.get('environment', {}).get('commit')} -> {current.get('environment', {}).get('commit')} ({args.metric})")
+    for row in rows:
+        flag = "  REGRESSION" if row["regression"] else ""
+        print(f"{row['benchmark']:>40} {row['before']:>10} {row['after']:>10} {row['change_pct']:>+8.1f}%{flag}")
+    if any(row["regression"] for row in rows):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
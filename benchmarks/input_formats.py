@@ -0,0 +1,71 @@
+"""Compares JSON and columnar request bodies for the attendance endpoints.
+
+Times decoding the body plus analyze_attendance for each format over
+synthetic histories of increasing length.
+
+Usage: python -m benchmarks.input_formats [--days 365 3650 36500] [--repeat 5]
+"""
+import argparse
+import json
+
+from columnar import pack, read_arrow, read_packed, read_parquet, write_arrow, write_parquet
+from function import ATTENDANCE_SECTIONS, analyze_attendance
+from benchmarks.payloads import synthetic_series
+from benchmarks.timing import best_time
+
+SECTIONS = list(ATTENDANCE_SECTIONS)
+
+
+def encoded_bodies(labels, series):
+    """Returns {format: (body, decoder)} for every format available here."""
+    json_body = json.dumps({"data": {
+        "labels": [str(label) for label in labels],
+        **{key: values.tolist() for key, values in series.items()},
+    }}).encode("utf-8")
+    bodies = {
+        "json": (json_body, json.loads),
+        "packed": (pack(labels, series), read_packed),
+    }
+    try:
+        bodies["arrow"] = (write_arrow(labels, series), read_arrow)
+        bodies["parquet"] = (write_parquet(labels, series), read_parquet)
+    except ValueError:
+        pass  # pyarrow is not installed
+    return bodies
+
+
+def run(days_list, repeat):
+    results = []
+    for days in days_list:
+        labels, series = synthetic_series(days)
+        for name, (body, decode) in encoded_bodies(labels, series).items():
+            decode_s = best_time(lambda: decode(body), repeat)
+            total_s = best_time(lambda: analyze_attendance(decode(body), SECTIONS), repeat)
+            results.append({
+                "days": days,
+                "format": name,
+                "body_bytes": len(body),
+                "decode_ms": round(decode_s * 1000, 3),
+                "decode_and_analyze_ms": round(total_s * 1000, 3),
+            })
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, nargs="+", default=[365, 3650, 36500])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args(argv)
+
+    results = run(args.days, args.repeat)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'days':>7} {'format':>8} {'bytes':>10} {'decode ms':>10} {'total ms':>10}")
+    for row in results:
+        print(f"{row['days']:>7} {row['format']:>8} {row['body_bytes']:>10} {row['decode_ms']:>10} {row['decode_and_analyze_ms']:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Times the pandas and NumPy leave_trends engines and checks they agree.
+
+Usage: python -m benchmarks.leave_trends_engines [--days 90 365 3650] [--check 200]
+
+--check runs that many random payloads through both engines and exits with
+status 1 if any serialized result differs.
+"""
+import argparse
+import json
+import sys
+
+import numpy as np
+
+from function import leave_trends
+from benchmarks.payloads import synthetic_payload
+from benchmarks.timing import time_calls
+
+
+def parity_mismatches(count, seed=0):
+    """Payloads (as seeds) for which the two engines disagree."""
+    rng = np.random.default_rng(seed)
+    mismatches = []
+    for i in range(count):
+        days = int(rng.integers(1, 400))
+        payload = synthetic_payload(days, sparsity=float(rng.random()), seed=seed + i)
+        rows = payload["data"]["plannedUnplannedLeavesTrends"]
+        if not rows:
+            continue
+        if rng.random() < 0.3:
+            rng.shuffle(rows)
+        expected = json.dumps(leave_trends(payload, "pandas"), sort_keys=True)
+        actual = json.dumps(leave_trends(payload, "numpy"), sort_keys=True)
+        if expected != actual:
+            mismatches.append(seed + i)
+    return mismatches
+
+
+def run(days_list, repeat):
+    results = []
+    for days in days_list:
+        payload = synthetic_payload(days, sparsity=0.2)
+        for engine in ("pandas", "numpy"):
+            results.append({"engine": engine, "days": days, **time_calls(lambda: leave_trends(payload, engine), repeat)})
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, nargs="+", default=[90, 365, 3650])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--check", type=int, default=200, help="Random payloads to compare (0 to skip)")
+    args = parser.parse_args(argv)
+
+    print(f"{'engine':>8} {'days':>6} {'p50 ms':>9} {'p95 ms':>9}")
+    for row in run(args.days, args.repeat):
+        print(f"{row['engine']:>8} {row['days']:>6} {row['p50_ms']:>9} {row['p95_ms']:>9}")
+
+    if args.check:
+        with np.errstate(all="ignore"):
+            mismatches = parity_mismatches(args.check)
+        print(f"parity: {args.check - len(mismatches)}/{args.check} payloads identical")
+        if mismatches:
+            print(f"mismatching seeds: {mismatches[:20]}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
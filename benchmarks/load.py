@@ -0,0 +1,103 @@
+"""In-process load test against the Flask app through its test client.
+
+Concurrent threads post synthetic payloads to the chosen endpoints and the
+run reports p50/p95/p99 latency, error counts and throughput. The result
+cache is disabled unless --cache is given, so repeated payloads measure
+the analysis itself.
+
+Usage: python -m benchmarks.load [--endpoints on_leave leave_trends] [--requests 500] [--concurrency 8]
+"""
+import argparse
+import itertools
+import json
+import threading
+import time
+
+from app import app, result_cache
+from benchmarks.payloads import synthetic_tenants
+from benchmarks.timing import environment, latency_summary
+
+ENDPOINTS = ["late_checkins", "on_leave", "non_checked_in", "no_record", "leave_trends", "analyze"]
+
+
+def run(endpoints, requests, concurrency, days, tenants, sparsity=0.5, cache=False):
+    payloads = list(synthetic_tenants(tenants, days, sparsity).values())
+    if not cache:
+        result_cache.max_entries = 0
+        result_cache.backend = None
+        result_cache.clear()
+
+    jobs = itertools.islice(itertools.cycle(itertools.product(endpoints, range(len(payloads)))), requests)
+    jobs_lock = threading.Lock()
+    timings = {endpoint: [] for endpoint in endpoints}
+    errors = {endpoint: 0 for endpoint in endpoints}
+
+    def worker():
+        client = app.test_client()
+        while True:
+            with jobs_lock:
+                job = next(jobs, None)
+            if job is None:
+                return
+            endpoint, index = job
+            start = time.perf_counter()
+            response = client.post(f"/{endpoint}", json=payloads[index])
+            elapsed = time.perf_counter() - start
+            with jobs_lock:
+                timings[endpoint].append(elapsed)
+                if response.status_code != 200:
+                    errors[endpoint] += 1
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    all_timings = [t for endpoint in endpoints for t in timings[endpoint]]
+    return {
+        "config": {
+            "endpoints": endpoints, "requests": requests, "concurrency": concurrency,
+            "days": days, "tenants": tenants, "sparsity": sparsity, "cache": cache,
+        },
+        "overall": {
+            **latency_summary(all_timings),
+            "errors": sum(errors.values()),
+            "throughput_rps": round(len(all_timings) / wall, 2),
+        },
+        "endpoints": {
+            endpoint: {**latency_summary(timings[endpoint]), "errors": errors[endpoint]}
+            for endpoint in endpoints if timings[endpoint]
+        },
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--endpoints", nargs="+", choices=ENDPOINTS, default=ENDPOINTS[:5])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--tenants", type=int, default=20)
+    parser.add_argument("--sparsity", type=float, default=0.5)
+    parser.add_argument("--cache", action="store_true", help="Keep the result cache enabled")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    results = run(args.endpoints, args.requests, args.concurrency, args.days, args.tenants, args.sparsity, args.cache)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"environment": environment(), "load": results}, f, indent=2)
+
+    overall = results["overall"]
+    print(f"{overall['count']} requests, {overall['throughput_rps']} req/s, {overall['errors']} errors")
+    print(f"{'endpoint':>16} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for endpoint, row in results["endpoints"].items():
+        print(f"{endpoint:>16} {row['p50_ms']:>9} {row['p95_ms']:>9} {row['p99_ms']:>9}")
+    print(f"{'overall':>16} {overall['p50_ms']:>9} {overall['p95_ms']:>9} {overall['p99_ms']:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Micro-benchmarks for each analysis function and summary generator.
+
+Usage: python -m benchmarks.micro [--days 90 365 3650] [--sparsity 0.5] [--repeat 20]
+"""
+import argparse
+import json
+
+from function import late_checkins, on_leave, non_checked_in, no_record, leave_trends
+from summary import (
+    generate_late_checkin_summary,
+    generate_leave_summary,
+    generate_leave_trend_summary,
+    generate_no_record_summary,
+    generate_non_checked_in_summary,
+)
+from benchmarks.payloads import synthetic_payload
+from benchmarks.timing import environment, time_calls
+
+# name -> (analysis function, summary generator)
+TARGETS = {
+    "late_checkins": (late_checkins, generate_late_checkin_summary),
+    "on_leave": (on_leave, generate_leave_summary),
+    "non_checked_in": (non_checked_in, generate_non_checked_in_summary),
+    "no_record": (no_record, generate_no_record_summary),
+    "leave_trends": (leave_trends, generate_leave_trend_summary),
+}
+
+
+def run(days_list, sparsity=0.5, repeat=20, targets=None):
+    results = []
+    for days in days_list:
+        payload = synthetic_payload(days, sparsity)
+        for name in targets or TARGETS:
+            analyze_fn, summary_fn = TARGETS[name]
+            analysis = analyze_fn(payload)
+            results.append({"benchmark": f"{name}", "days": days, **time_calls(lambda: analyze_fn(payload), repeat)})
+            results.append({"benchmark": f"{name}_summary", "days": days, **time_calls(lambda: summary_fn(analysis), repeat)})
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, nargs="+", default=[90, 365, 3650])
+    parser.add_argument("--sparsity", type=float, default=0.5)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--targets", nargs="+", choices=list(TARGETS))
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    results = run(args.days, args.sparsity, args.repeat, args.targets)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"environment": environment(), "micro": results}, f, indent=2)
+    print(f"{'benchmark':>24} {'days':>6} {'p50 ms':>9} {'p95 ms':>9}")
+    for row in results:
+        print(f"{row['benchmark']:>24} {row['days']:>6} {row['p50_ms']:>9} {row['p95_ms']:>9}")
+
+
+if __name__ == "__main__":
+    main()
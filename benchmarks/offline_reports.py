@@ -0,0 +1,81 @@
+"""Compares the offline report runner with posting each payload file to /analyze.
+
+Usage: python -m benchmarks.offline_reports [--files 200] [--days 365] [--workers 4]
+
+"http" posts every file through the Flask test client, as the nightly
+scripts did (no network, so real HTTP costs more). "reports" is a cold
+run of reports.run_reports over the same files, and "reports (unchanged)"
+a second run where the manifest skips every file.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.payloads import synthetic_payload
+
+
+def write_payloads(directory, files, days):
+    for i in range(files):
+        payload = synthetic_payload(days, sparsity=0.3, seed=i)
+        data = payload["data"]
+        data["labels"] = [str(label) for label in data["labels"]]
+        for key, values in data.items():
+            if isinstance(values, np.ndarray):
+                data[key] = values.tolist()
+        with open(os.path.join(directory, f"hostel-{i:05}.json"), "w") as f:
+            json.dump(payload, f)
+
+
+def http_run(paths):
+    from app import app
+
+    client = app.test_client()
+    with open(os.devnull, "wb") as sink:
+        for path in paths:
+            with open(path, "rb") as f:
+                response = client.post("/analyze", data=f.read(), content_type="application/json")
+            sink.write(response.get_data())
+
+
+def run(files, days, workers):
+    from reports import run_reports
+
+    with tempfile.TemporaryDirectory() as directory:
+        inputs = os.path.join(directory, "in")
+        os.mkdir(inputs)
+        write_payloads(inputs, files, days)
+        paths = sorted(os.path.join(inputs, name) for name in os.listdir(inputs))
+        output = os.path.join(directory, "reports.jsonl")
+
+        rows = []
+        start = time.perf_counter()
+        http_run(paths)
+        rows.append({"mode": "http", "seconds": time.perf_counter() - start})
+        for mode in ("reports", "reports (unchanged)"):
+            start = time.perf_counter()
+            run_reports([inputs], output, workers=workers)
+            rows.append({"mode": mode, "seconds": time.perf_counter() - start})
+    for row in rows:
+        row["files_per_s"] = round(files / row["seconds"], 1)
+        row["seconds"] = round(row["seconds"], 3)
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args(argv)
+
+    print(f"{'mode':>20} {'seconds':>9} {'files/s':>9}")
+    for row in run(args.files, args.days, args.workers):
+        print(f"{row['mode']:>20} {row['seconds']:>9} {row['files_per_s']:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Synthetic payloads shaped like data.json."""
+import numpy as np
+
+from function import ATTENDANCE_SECTIONS
+
+SERIES_KEYS = [spec[0] for spec in ATTENDANCE_SECTIONS.values()]
+
+# Rough per-series daily means seen in data.json
+SERIES_MEANS = {
+    "late_checked_in": 0.5,
+    "on_leave": 12.0,
+    "non_checked_in": 1.0,
+    "no_record": 300.0,
+}
+
+
+def synthetic_series(days, sparsity=0.5, seed=0, start="2020-01-01"):
+    """Returns (datetime64[D] labels, {series key: int32 counts}).
+
+    `sparsity` is the fraction of days forced to zero for every series.
+    """
+    rng = np.random.default_rng(seed)
+    first = np.datetime64(start, "D")
+    labels = np.arange(first, first + days)
+    series = {}
+    for key in SERIES_KEYS:
+        counts = rng.poisson(SERIES_MEANS[key], days)
+        counts[rng.random(days) < sparsity] = 0
+        series[key] = counts.astype(np.int32)
+    return labels, series
+
+
+def leave_trend_rows(labels, sparsity=0.5, seed=0):
+    """plannedUnplannedLeavesTrends rows, with string counts as the upstream API sends them."""
+    rng = np.random.default_rng(seed + 1)
+    rows = []
+    for label in labels:
+        if rng.random() < sparsity:
+            continue
+        urgent = int(rng.poisson(4))
+        planned = int(rng.poisson(3))
+        total = urgent + planned
+        if total == 0:
+            continue
+        rows.append({
+            "date": str(label),
+            "urgent_count": str(urgent),
+            "planned_count": str(planned),
+            "total_leaves": total,
+            "urgent_percentage": f"{urgent * 100 / total:.2f}",
+            "planned_percentage": f"{planned * 100 / total:.2f}",
+        })
+    return rows
+
+
+def synthetic_payload(days, sparsity=0.5, seed=0):
+    """A data.json-shaped payload covering `days` days."""
+    labels, series = synthetic_series(days, sparsity, seed)
+    data = {"labels": [str(label) for label in labels]}
+    data.update({key: values.tolist() for key, values in series.items()})
+    data["plannedUnplannedLeavesTrends"] = leave_trend_rows(labels, sparsity, seed)
+    return {"error": False, "status": "success", "data": data}
+
+
+def synthetic_tenants(tenants, days, sparsity=0.5, seed=0):
+    """{hostel_id: payload} with a different series per tenant."""
+    return {
+        f"hostel-{i:04d}": synthetic_payload(days, sparsity, seed + i)
+        for i in range(tenants)
+    }
@@ -0,0 +1,82 @@
+"""Compares response size and encoding time of jsonify with the serialization fast path.
+
+Usage: python -m benchmarks.response_encoding [--days 365 3650 36500] [--hostels 50] [--repeat 10]
+
+Each case encodes a full /analyze result (all sections plus summaries):
+one hostel per history length, and a /batch-shaped result of `--hostels`
+hostels with a 365-day history each. "jsonify" is Flask's encoder as the
+endpoints used it; "stdlib" and "orjson" are serialization.dumps with and
+without orjson. Times include building the compact layout and compressing.
+"""
+import argparse
+
+import numpy as np
+
+import serialization
+from app import app
+from function import analyze
+from summary import with_summaries
+from benchmarks.payloads import synthetic_payload
+from benchmarks.timing import time_calls
+
+
+def analysis_result(days, seed=0):
+    with np.errstate(all="ignore"):
+        return with_summaries(analyze(synthetic_payload(days, sparsity=0.3, seed=seed)))
+
+
+def encoders():
+    def jsonify(result):
+        with app.app_context():
+            return app.json.response(result).get_data()
+
+    encoders = {
+        "jsonify": jsonify,
+        "stdlib": serialization.stdlib_dumps,
+    }
+    if serialization.orjson is not None:
+        encoders["orjson"] = serialization.dumps
+    return encoders
+
+
+def run(days_list, hostels, repeat):
+    cases = [(f"{days} days", analysis_result(days)) for days in days_list]
+    if hostels:
+        cases.append((f"batch x{hostels}", {"results": {f"h{i}": analysis_result(365, seed=i) for i in range(hostels)}}))
+
+    rows = []
+    for case, result in cases:
+        for encoder, dumps in encoders().items():
+            layouts = ["nested"] if encoder == "jsonify" else serialization.LAYOUTS
+            encodings = [None] if encoder == "jsonify" else [None] + serialization.ENCODINGS
+            for layout in layouts:
+                for encoding in encodings:
+                    def encode():
+                        body = dumps(serialization.compact(result) if layout == "compact" else result)
+                        return serialization.compress(body, encoding)
+
+                    rows.append({
+                        "case": case,
+                        "encoder": encoder,
+                        "layout": layout,
+                        "encoding": encoding or "identity",
+                        "bytes": len(encode()),
+                        **time_calls(encode, repeat),
+                    })
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, nargs="+", default=[365, 3650, 36500])
+    parser.add_argument("--hostels", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    print(f"{'case':>12} {'encoder':>8} {'layout':>7} {'encoding':>9} {'bytes':>10} {'p50 ms':>9}")
+    for row in run(args.days, args.hostels, args.repeat):
+        print(f"{row['case']:>12} {row['encoder']:>8} {row['layout']:>7} {row['encoding']:>9} {row['bytes']:>10} {row['p50_ms']:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Times rolling_analysis against an equivalent pandas .rolling() pipeline and checks they agree.
+
+Usage: python -m benchmarks.rolling_windows [--days 90 365 3650] [--windows 7 30] [--check 50]
+"""
+import argparse
+import sys
+
+import numpy as np
+
+from rolling import rolling_analysis
+from benchmarks.payloads import synthetic_payload
+from benchmarks.timing import time_calls
+
+
+def longest_streak(window):
+    best = run = 0
+    for value in window:
+        run = run + 1 if value > 0 else 0
+        best = max(best, run)
+    return best
+
+
+def pandas_rolling(payload, windows):
+    """Reference implementation with pandas' rolling windows (min_periods=1)."""
+    import pandas as pd
+
+    series = payload["data"]
+    frame = pd.DataFrame(
+        {key: np.asarray(series[key]) for key in ("late_checked_in", "on_leave", "non_checked_in", "no_record")},
+        index=pd.to_datetime(series["labels"]),
+    )
+    frame = frame.groupby(level=0).sum().asfreq("D", fill_value=0)
+    results = {}
+    for w in windows:
+        rolled = frame.rolling(w, min_periods=1)
+        q1, q3 = rolled.quantile(0.25), rolled.quantile(0.75)
+        thresholds = q3 + 1.5 * (q3 - q1)
+        results[str(w)] = {
+            "totals": rolled.sum(),
+            "averages": rolled.mean().round(2),
+            "max_consecutive_days": rolled.apply(longest_streak, raw=True),
+            "anomaly_thresholds": thresholds,
+            "anomalies": frame > thresholds,
+        }
+    return results
+
+
+def mismatches(count, windows, seed=0):
+    rng = np.random.default_rng(seed)
+    failed = []
+    for i in range(count):
+        payload = synthetic_payload(int(rng.integers(1, 200)), sparsity=float(rng.random()), seed=seed + i)
+        actual = rolling_analysis(payload, windows)["windows"]
+        expected = pandas_rolling(payload, windows)
+        for w, stats in expected.items():
+            for name, frame in stats.items():
+                for column, section in zip(frame.columns, ("late_checkins", "on_leave", "non_checked_in", "no_record")):
+                    if not np.allclose(frame[column].to_numpy(dtype=float), np.asarray(actual[w][section][name], dtype=float)):
+                        failed.append(seed + i)
+                        break
+    return sorted(set(failed))
+
+
+def run(days_list, windows, repeat):
+    results = []
+    for days in days_list:
+        payload = synthetic_payload(days, sparsity=0.3)
+        for engine, fn in (("pandas", pandas_rolling), ("numpy", rolling_analysis)):
+            results.append({"engine": engine, "days": days, **time_calls(lambda: fn(payload, windows), repeat)})
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, nargs="+", default=[90, 365, 3650])
+    parser.add_argument("--windows", type=int, nargs="+", default=[7, 30])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--check", type=int, default=50, help="Random payloads to compare (0 to skip)")
+    args = parser.parse_args(argv)
+
+    print(f"{'engine':>8} {'days':>6} {'p50 ms':>9} {'p95 ms':>9}")
+    for row in run(args.days, args.windows, args.repeat):
+        print(f"{row['engine']:>8} {row['days']:>6} {row['p50_ms']:>9} {row['p95_ms']:>9}")
+
+    if args.check:
+        failed = mismatches(args.check, args.windows)
+        print(f"parity: {args.check - len(failed)}/{args.check} payloads identical")
+        if failed:
+            print(f"mismatching seeds: {failed[:20]}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
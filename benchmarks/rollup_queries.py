@@ -0,0 +1,60 @@
+"""Times date-range queries from the rollup store against recomputing them from raw days.
+
+raw_days analyzes counts already in memory; raw_payload adds decoding the
+JSON history the endpoints would otherwise have to receive on every call.
+
+Usage: python -m benchmarks.rollup_queries [--days 365 3650] [--repeat 20]
+"""
+import argparse
+import json
+import os
+import tempfile
+
+import numpy as np
+
+from function import analyze_counts, on_leave
+from rollups import RollupStore
+from benchmarks.payloads import synthetic_payload
+from benchmarks.timing import time_calls
+
+
+def run(days_list, repeat):
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        store = RollupStore(os.path.join(directory, "rollups.db"))
+        for days in days_list:
+            hostel = f"bench-{days}"
+            payload = synthetic_payload(days, sparsity=0.3)
+            store.ingest(hostel, payload)
+            labels = np.asarray(payload["data"]["labels"], dtype="datetime64[D]")
+            counts = np.asarray(payload["data"]["on_leave"])
+            # A range that starts and ends mid-month, covering 80% of the history
+            lo, hi = days // 10, days - days // 10
+            start, end = str(labels[lo]), str(labels[hi - 1])
+            body = json.dumps({"data": {
+                "labels": [str(label) for label in labels[lo:hi]],
+                "on_leave": counts[lo:hi].tolist(),
+            }})
+
+            results.append({"benchmark": "raw_days", "days": days, **time_calls(
+                lambda: analyze_counts(labels[lo:hi], counts[lo:hi]), repeat)})
+            results.append({"benchmark": "raw_payload", "days": days, **time_calls(
+                lambda: on_leave(json.loads(body)), repeat)})
+            results.append({"benchmark": "rollups", "days": days, **time_calls(
+                lambda: store.query(hostel, ["on_leave"], start, end), repeat)})
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, nargs="+", default=[365, 3650, 36500])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    print(f"{'benchmark':>12} {'days':>6} {'p50 ms':>9} {'p95 ms':>9}")
+    for row in run(args.days, args.repeat):
+        print(f"{row['benchmark']:>12} {row['days']:>6} {row['p50_ms']:>9} {row['p95_ms']:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Compares per-worker memory and latency of per-request payloads vs. a memory-mapped shared dataset.
+
+Usage: python -m benchmarks.shared_memory [--days 36500] [--workers 4]
+
+Each worker process holds one history and analyzes it repeatedly, either
+decoded from JSON into its own heap ("payload") or opened by id from a
+SharedDatasets directory ("mapped"). Memory is the proportional set size
+(PSS) from /proc/self/smaps_rollup, so pages shared between workers are
+split among them; it is reported as unavailable on other platforms.
+"""
+import argparse
+import json
+import multiprocessing
+import tempfile
+
+import numpy as np
+
+from benchmarks.payloads import synthetic_payload
+from benchmarks.timing import time_calls
+
+
+def pss_mb():
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                if line.startswith("Pss:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        return None
+
+
+def json_body(days):
+    payload = synthetic_payload(days, sparsity=0.3)
+    data = payload["data"]
+    data["labels"] = [str(label) for label in data["labels"]]
+    for key, values in data.items():
+        if isinstance(values, np.ndarray):
+            data[key] = values.tolist()
+    return json.dumps(payload)
+
+
+def worker(mode, source, repeat, barrier, results):
+    from function import analyze
+
+    baseline = pss_mb()
+    if mode == "payload":
+        data = json.loads(source)
+        run = lambda: analyze(data)
+    else:
+        from shared_datasets import SharedDatasets
+
+        directory, dataset_id = source
+        dataset = SharedDatasets(directory).get(dataset_id)
+        run = dataset.analysis
+    with np.errstate(all="ignore"):
+        timing = time_calls(run, repeat)
+    # Measure while every worker still holds its data, so shared pages are split between them
+    barrier.wait()
+    pss = pss_mb()
+    results.put({"pss_mb": pss, "growth_mb": None if pss is None else round(pss - baseline, 1), **timing})
+    barrier.wait()
+
+
+def run(days, workers, repeat):
+    body = json_body(days)
+    with tempfile.TemporaryDirectory() as directory:
+        from shared_datasets import SharedDatasets
+
+        dataset_id = SharedDatasets(directory).register(json.loads(body))
+        rows = []
+        context = multiprocessing.get_context("spawn")
+        for mode, source in (("payload", body), ("mapped", (directory, dataset_id))):
+            barrier = context.Barrier(workers)
+            results = context.Queue()
+            processes = [context.Process(target=worker, args=(mode, source, repeat, barrier, results)) for _ in range(workers)]
+            for process in processes:
+                process.start()
+            samples = [results.get() for _ in processes]
+            for process in processes:
+                process.join()
+            growth = [sample["growth_mb"] for sample in samples]
+            rows.append({
+                "mode": mode,
+                "workers": workers,
+                "growth_mb_per_worker": None if None in growth else round(sum(growth) / len(growth), 1),
+                "p50_ms": round(float(np.median([sample["p50_ms"] for sample in samples])), 3),
+            })
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, default=36500)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    print(f"{'mode':>8} {'workers':>8} {'MB/worker':>10} {'p50 ms':>9}")
+    for row in run(args.days, args.workers, args.repeat):
+        print(f"{row['mode']:>8} {row['workers']:>8} {str(row['growth_mb_per_worker']):>10} {row['p50_ms']:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Measures worker cold-start cost in the lazy and preload startup modes.
+
+Each run starts a fresh interpreter with python -X importtime. It records how
+long `import app` takes and how long the process needs to answer its first
+/late_checkins and /leave_trends requests. It also lists the slowest imports.
+
+Usage: python -m benchmarks.startup [--runs 5] [--top 10] [--json]
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+# Runs inside the child interpreter; prints timings as JSON on the last line
+CHILD = """
+import json, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+client = app.app.test_client()
+payload = json.load(open("data.json"))
+client.post("/late_checkins", json=payload)
+first = time.perf_counter()
+client.post("/leave_trends", json=payload)
+second = time.perf_counter()
+print(json.dumps({"import_ms": (imported - start) * 1000, "first_request_ms": (first - imported) * 1000,
+                  "leave_trends_request_ms": (second - first) * 1000, "total_ms": (second - start) * 1000}))
+"""
+
+IMPORTTIME = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+MODES = {
+    "lazy": {"ANALYSIS_PRELOAD": "0"},
+    "preload": {"ANALYSIS_PRELOAD": "1"},
+}
+
+
+def run_child(mode):
+    env = dict(os.environ, ANALYSIS_CACHE_SIZE="0", **MODES[mode])
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD],
+        capture_output=True, text=True, env=env, check=True,
+    )
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    imports = []
+    for match in IMPORTTIME.finditer(result.stderr):
+        _, cumulative, indent, name = match.groups()
+        # Top-level imports and what app imports directly; deeper modules are
+        # already included in their parent's cumulative time
+        if len(indent) <= 3 and name != "app":
+            imports.append((name, int(cumulative) / 1000))
+    return timings, imports
+
+
+def run(runs, top):
+    report = {}
+    for mode in MODES:
+        samples = []
+        slowest = {}
+        for _ in range(runs):
+            timings, imports = run_child(mode)
+            samples.append(timings)
+            for name, ms in imports:
+                slowest[name] = max(slowest.get(name, 0), ms)
+        report[mode] = {
+            key: round(statistics.median(sample[key] for sample in samples), 1)
+            for key in samples[0]
+        }
+        report[mode]["slowest_imports_ms"] = dict(
+            sorted(((name, round(ms, 1)) for name, ms in slowest.items()), key=lambda item: -item[1])[:top]
+        )
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args(argv)
+
+    report = run(args.runs, args.top)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    for mode, row in report.items():
+        print(f"{mode}: import app {row['import_ms']} ms, first request {row['first_request_ms']} ms, "
+              f"leave_trends {row['leave_trends_request_ms']} ms, total {row['total_ms']} ms")
+        for name, ms in row["slowest_imports_ms"].items():
+            print(f"    {name:<40} {ms:>8} ms")
+
+
+if __name__ == "__main__":
+    main()
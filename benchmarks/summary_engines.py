@@ -0,0 +1,94 @@
+"""Times the rule-driven summary engine against the hand-written generators and checks they agree.
+
+Usage: python -m benchmarks.summary_engines [--hostels 200] [--days 365] [--check 200]
+
+Summaries are rendered for every section of `--hostels` analysis results,
+one call per result.
+"""
+import argparse
+import json
+import sys
+
+import numpy as np
+
+from function import analyze
+from summary import SUMMARY_GENERATORS
+from summary_engine import RULES_PATH, SummaryEngine
+from benchmarks.payloads import synthetic_payload
+from benchmarks.timing import time_calls
+
+
+def analyses_for(count, days, seed=0):
+    rng = np.random.default_rng(seed)
+    results = []
+    for i in range(count):
+        payload = synthetic_payload(days, sparsity=float(rng.random()), seed=seed + i)
+        with np.errstate(all="ignore"):
+            results.append(analyze(payload))
+    return results
+
+
+def parity_mismatches(count, seed=0):
+    engine = SummaryEngine.from_file(RULES_PATH)
+    rng = np.random.default_rng(seed)
+    mismatches = []
+    for i in range(count):
+        days = int(rng.integers(1, 400))
+        with np.errstate(all="ignore"):
+            results = analyze(synthetic_payload(days, sparsity=float(rng.random()), seed=seed + i))
+        for section, analysis in results.items():
+            if "error" in analysis:
+                continue
+            expected = json.dumps(SUMMARY_GENERATORS[section](analysis), sort_keys=True)
+            actual = json.dumps(engine.summarize(section, analysis), sort_keys=True)
+            if expected != actual:
+                mismatches.append((seed + i, section))
+    return mismatches
+
+
+def run(hostels, days, repeat):
+    analyses = analyses_for(hostels, days)
+    by_section = {
+        section: [results[section] for results in analyses if "error" not in results[section]]
+        for section in SUMMARY_GENERATORS
+    }
+    engine = SummaryEngine.from_file(RULES_PATH)
+
+    def python():
+        for section, items in by_section.items():
+            for analysis in items:
+                SUMMARY_GENERATORS[section](analysis)
+
+    def rules():
+        for section, items in by_section.items():
+            for analysis in items:
+                engine.summarize(section, analysis)
+
+    return [
+        {"engine": "python", **time_calls(python, repeat)},
+        {"engine": "rules", **time_calls(rules, repeat)},
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hostels", type=int, default=200)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--check", type=int, default=200, help="Random payloads to compare (0 to skip)")
+    args = parser.parse_args(argv)
+
+    print(f"{'engine':>12} {'p50 ms':>9} {'p95 ms':>9}")
+    for row in run(args.hostels, args.days, args.repeat):
+        print(f"{row['engine']:>12} {row['p50_ms']:>9} {row['p95_ms']:>9}")
+
+    if args.check:
+        mismatches = parity_mismatches(args.check)
+        print(f"parity: {len(mismatches)} mismatching summaries across {args.check} payloads")
+        if mismatches:
+            print(f"mismatching (seed, section): {mismatches[:20]}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
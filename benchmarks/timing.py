@@ -0,0 +1,58 @@
+"""Timing helpers shared by the benchmarks."""
+import platform
+import subprocess
+import time
+
+import numpy as np
+
+
+def best_time(fn, repeat):
+    """Fastest of `repeat` calls to fn, in seconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def time_calls(fn, repeat, warmup=1):
+    """Runs fn `repeat` times after warm-up and summarizes the timings in milliseconds."""
+    for _ in range(warmup):
+        fn()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return latency_summary(timings)
+
+
+def latency_summary(timings):
+    ms = np.asarray(timings) * 1000
+    return {
+        "count": len(ms),
+        "min_ms": round(float(ms.min()), 3),
+        "mean_ms": round(float(ms.mean()), 3),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+        "max_ms": round(float(ms.max()), 3),
+    }
+
+
+def environment():
+    """Metadata recorded with every result file so runs can be compared across commits."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
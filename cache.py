@@ -0,0 +1,173 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from sqlite_local import LocalConnections
+
+
+def _canonical(value):
+    # Only reached for non-JSON values, i.e. once NumPy is already loaded
+    import numpy as np
+
+    # Arrays from columnar bodies are hashed by dtype, shape and raw bytes
+    if isinstance(value, np.ndarray):
+        return {"dtype": value.dtype.str, "shape": value.shape, "sha256": hashlib.sha256(value.tobytes()).hexdigest()}
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+
+def cache_key(endpoint, data, **params):
+    """Content hash of the endpoint, its parameters and the canonicalized input series."""
+    payload = data.get("data", data) if isinstance(data, dict) else data
+    canonical = json.dumps(
+        {"endpoint": endpoint, "params": params, "data": payload},
+        sort_keys=True, separators=(",", ":"), default=_canonical,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class SQLiteBackend:
+    """Cache store in a local SQLite file, shared by every worker that opens it."""
+
+    def __init__(self, path, max_entries=10000, ttl=300):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._connections = LocalConnections(path)
+        self._connections.create_schema(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)",
+            "CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)",
+        )
+
+    def get(self, key):
+        now = time.time()
+        with self._connections.connect() as conn:
+            row = conn.execute(
+                "SELECT value FROM results WHERE key = ? AND created > ?", (key, now - self.ttl)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE results SET accessed = ? WHERE key = ?", (now, key))
+        return json.loads(row[0])
+
+    def set(self, key, value):
+        now = time.time()
+        with self._connections.connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO results (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now, now),
+            )
+            conn.execute("DELETE FROM results WHERE created <= ?", (now - self.ttl,))
+            conn.execute(
+                "DELETE FROM results WHERE key NOT IN "
+                "(SELECT key FROM results ORDER BY accessed DESC LIMIT ?)",
+                (self.max_entries,),
+            )
+
+    def clear(self):
+        with self._connections.connect() as conn:
+            conn.execute("DELETE FROM results")
+
+    def __len__(self):
+        return self._connections.connect().execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+
+class ResultCache:
+    """In-process LRU + TTL cache for analysis results with an optional shared backend."""
+
+    def __init__(self, max_entries=256, ttl=300, backend=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.backend = backend
+        self.hits = 0
+        self.backend_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                created, value = entry
+                if time.monotonic() - created < self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+
+        if self.backend is not None:
+            value = self.backend.get(key)
+            if value is not None:
+                with self._lock:
+                    self.backend_hits += 1
+                self._store(key, value)
+                return value
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key, value):
+        self._store(key, value)
+        if self.backend is not None:
+            try:
+                self.backend.set(key, value)
+            except (TypeError, ValueError, sqlite3.Error):
+                # Results that cannot be shared are still kept in process
+                pass
+
+    def _store(self, key, value):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_compute(self, endpoint, data, compute, **params):
+        """Returns the cached result for this input, computing and storing it on a miss."""
+        key = cache_key(endpoint, data, **params)
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.set(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self.backend is not None:
+            self.backend.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.backend_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "backend_hits": self.backend_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.hits + self.backend_hits) / lookups, 3) if lookups else 0.0,
+                "backend": type(self.backend).__name__ if self.backend is not None else None,
+            }
+
+
+def cache_from_env():
+    """Builds the app's result cache from ANALYSIS_CACHE_* environment variables."""
+    max_entries = int(os.environ.get("ANALYSIS_CACHE_SIZE", 256))
+    ttl = float(os.environ.get("ANALYSIS_CACHE_TTL", 300))
+    path = os.environ.get("ANALYSIS_CACHE_PATH")
+    backend = None
+    if path:
+        backend = SQLiteBackend(path, max_entries=int(os.environ.get("ANALYSIS_CACHE_SHARED_SIZE", 10000)), ttl=ttl)
+    return ResultCache(max_entries=max_entries, ttl=ttl, backend=backend)
@@ -0,0 +1,175 @@
+"""Group-by analysis of long-format records.
+
+A cohort payload holds one record per date and group (a student, a block,
+a year of study, ...) instead of one pre-aggregated hostel series:
+
+    {"group_by": ["block", "year"],
+     "records": [{"date": "2025-01-31", "block": "A", "year": 2, "on_leave": 3,
+                  "urgent_count": 1, "planned_count": 2}, ...]}
+
+"records" may also be an object of equal-length columns. A metric missing
+from a record counts as zero. All records are reduced to dense
+(groups x days) matrices in one pass: the group keys are factorized into
+sorted group indexes and each metric is summed per (group, day) segment
+with a single bincount. The attendance sections of every group and of the
+overall rollup then go through one analyze_counts call. leave_trends uses
+each group's days with leaves, with percentages recomputed from the summed
+urgent and planned counts.
+"""
+import numpy as np
+
+from dates import calendar_for, parse_labels
+from function import ALL_SECTIONS, ATTENDANCE_SECTIONS, analyze_counts, section_statistics
+from leave_trends_numpy import leave_trends_matrix
+from metrics import stage
+from summary import with_summaries
+
+LEAVE_METRICS = ["urgent_count", "planned_count"]
+# np.unique would merge 1 with "1" (and True with 1), so every group key must hold one kind of value
+KEY_KINDS = {str: "string", int: "number", float: "number", bool: "boolean"}
+
+
+def record_columns(records, group_by):
+    """{field: values} from a list of records or an object of columns."""
+    if isinstance(records, dict):
+        columns = dict(records)
+        if len({len(values) for values in columns.values()}) > 1:
+            raise ValueError("Record columns have different lengths")
+    elif isinstance(records, list) and all(isinstance(record, dict) for record in records):
+        fields = set().union(*records)
+        columns = {field: [record.get(field) for record in records] for field in fields}
+    else:
+        raise ValueError("Expected 'records' as a list of objects or an object of columns")
+
+    for field in ["date"] + group_by:
+        if field not in columns:
+            raise ValueError(f"Records have no '{field}' field")
+        missing = next((i for i, value in enumerate(columns[field]) if value is None), None)
+        if missing is not None:
+            raise ValueError(f"Record {missing} has no '{field}'")
+    return columns
+
+
+def group_index(columns, group_by):
+    """(sorted group id of every record, key values of every group)."""
+    codes = 0
+    uniques = []
+    for key in group_by:
+        kinds = {KEY_KINDS.get(type(value)) for value in columns[key]}
+        if None in kinds:
+            raise ValueError(f"Group key '{key}' must hold strings, numbers or booleans")
+        if len(kinds) > 1:
+            raise ValueError(f"Group key '{key}' mixes value types")
+        values, inverse = np.unique(np.asarray(columns[key]), return_inverse=True)
+        codes = codes * len(values) + inverse
+        uniques.append(values)
+    group_codes, group_ids = np.unique(codes, return_inverse=True)
+    positions = np.unravel_index(group_codes, [len(values) for values in uniques])
+    groups = [
+        {key: values[index].item() for key, values, index in zip(group_by, uniques, indexes)}
+        for indexes in zip(*(position.tolist() for position in positions))
+    ]
+    return group_ids, groups
+
+
+def segment_sums(segments, values, n_groups, n_days):
+    """Sums values per (group, day) segment into a (groups + 1) x days matrix whose last row is the overall total."""
+    weights = np.asarray(values, dtype=float)
+    # Records without the metric (None) count as zero
+    weights[np.isnan(weights)] = 0
+    sums = np.bincount(segments, weights=weights, minlength=n_groups * n_days).reshape(n_groups, n_days)
+    return np.vstack([sums, sums.sum(axis=0)])
+
+
+def leave_matrices(days, urgent, planned, detector=None):
+    """leave_trends for every row of the (rows x days) urgent and planned matrices."""
+    total = urgent + planned
+    with np.errstate(divide="ignore", invalid="ignore"):
+        urgent_pct = np.round(urgent / total * 100, 2)
+        planned_pct = np.round(planned / total * 100, 2)
+    results = []
+    for i in range(total.shape[0]):
+        # Like plannedUnplannedLeavesTrends, only days with leaves have a row
+        with_leaves = total[i] > 0
+        if not with_leaves.any():
+            results.append({"error": "No leave records"})
+            continue
+        values = np.vstack([
+            urgent[i, with_leaves], planned[i, with_leaves], total[i, with_leaves],
+            urgent_pct[i, with_leaves], planned_pct[i, with_leaves],
+        ])
+        try:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                results.append(leave_trends_matrix(days[with_leaves], values, detector))
+        except Exception as e:
+            results.append({"error": str(e)})
+    return results
+
+
+def cohort_analysis(data, group_by=None, sections=None, detector=None):
+    """Analyzes every group of a cohort payload and the overall rollup, with summaries."""
+    group_by = data.get("group_by") if group_by is None else group_by
+    if isinstance(group_by, str):
+        group_by = [group_by]
+    if not group_by or not all(isinstance(key, str) for key in group_by):
+        raise ValueError("Expected 'group_by' as a non-empty list of record fields")
+    unknown = [section for section in sections or [] if section not in ALL_SECTIONS]
+    if unknown:
+        raise ValueError(f"Unknown sections: {', '.join(unknown)}")
+
+    with stage("cohorts.group"):
+        columns = record_columns(data.get("records"), group_by)
+        if not len(columns["date"]):
+            raise ValueError("No records")
+        days, day_index = np.unique(parse_labels(columns["date"]), return_inverse=True)
+        group_ids, groups = group_index(columns, group_by)
+        n_groups, n_days = len(groups), len(days)
+        segments = group_ids * n_days + day_index
+
+    if sections is None:
+        sections = [section for section, spec in ATTENDANCE_SECTIONS.items() if spec[0] in columns]
+        if any(metric in columns for metric in LEAVE_METRICS):
+            sections.append("leave_trends")
+    # One result dict per group, then the overall rollup
+    results = [{} for _ in range(n_groups + 1)]
+
+    attendance = [section for section in sections if section in ATTENDANCE_SECTIONS]
+    available = [section for section in attendance if ATTENDANCE_SECTIONS[section][0] in columns]
+    for section in attendance:
+        if section not in available:
+            for result in results:
+                result[section] = {"error": f"Records have no '{ATTENDANCE_SECTIONS[section][0]}' field"}
+    if available:
+        with stage("cohorts.attendance"):
+            counts = np.vstack([
+                segment_sums(segments, columns[ATTENDANCE_SECTIONS[section][0]], n_groups, n_days)
+                for section in available
+            ]).astype(np.int64)
+            analyses = iter(analyze_counts(calendar_for(days), counts, detector))
+            for section in available:
+                for result in results:
+                    result[section] = section_statistics(section, next(analyses))
+
+    if "leave_trends" in sections:
+        with stage("cohorts.leave_trends"):
+            if not any(metric in columns for metric in LEAVE_METRICS):
+                leave_results = [{"error": "Records have no 'urgent_count' or 'planned_count' field"}] * (n_groups + 1)
+            else:
+                urgent, planned = (
+                    segment_sums(segments, columns.get(metric, [0] * len(group_ids)), n_groups, n_days)
+                    for metric in LEAVE_METRICS
+                )
+                leave_results = leave_matrices(days, urgent, planned, detector)
+            for result, leave_result in zip(results, leave_results):
+                result["leave_trends"] = leave_result
+
+    record_counts = np.bincount(group_ids, minlength=n_groups).tolist()
+    ordered = [{section: result[section] for section in sections if section in result} for result in results]
+    return {
+        "group_by": group_by,
+        "groups": [
+            {"group": group, "records": count, "results": with_summaries(result)}
+            for group, count, result in zip(groups, record_counts, ordered)
+        ],
+        "overall": {"records": len(group_ids), "results": with_summaries(ordered[-1])},
+    }
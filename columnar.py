@@ -0,0 +1,154 @@
+"""Columnar binary request bodies for the attendance count endpoints.
+
+The readers turn a body into the usual payload shape, but with NumPy arrays
+in place of JSON lists:
+
+    {"data": {"labels": datetime64[D] array, "late_checked_in": int array, ...}}
+
+so function.py skips JSON decoding and string date parsing. Supported
+Content-Types:
+
+- application/x-attendance-packed: PACKED_MAGIC header, int32 epoch days,
+  then one int32 row per series (see pack)
+- application/vnd.apache.arrow.stream / .file: Arrow IPC (requires pyarrow)
+- application/vnd.apache.parquet / application/x-parquet: Parquet (requires pyarrow)
+
+Arrow and Parquet tables need a "date" (or "labels") column plus one column
+per count series, named as in data.json.
+"""
+import io
+import struct
+
+import numpy as np
+
+PACKED_CONTENT_TYPE = "application/x-attendance-packed"
+PACKED_MAGIC = b"ATND"
+PACKED_VERSION = 1
+# magic, version, number of series, number of days
+PACKED_HEADER = struct.Struct("<4sHHI")
+PACKED_NAME_SIZE = 16
+
+
+def pack(labels, series):
+    """Encodes labels and {payload key: counts} into the packed format."""
+    days = np.asarray(labels, dtype="datetime64[D]").astype("<i4")
+    names = list(series)
+    header = PACKED_HEADER.pack(PACKED_MAGIC, PACKED_VERSION, len(names), len(days))
+    encoded_names = b"".join(name.encode("ascii").ljust(PACKED_NAME_SIZE, b"\0") for name in names)
+    counts = np.vstack([np.asarray(series[name], dtype="<i4") for name in names]) if names else np.empty((0, len(days)), "<i4")
+    return header + encoded_names + days.tobytes() + counts.tobytes()
+
+
+def read_packed(body):
+    """Decodes a packed body; the arrays are read-only views over the body buffer."""
+    names, days, counts = packed_arrays(body)
+    data = {name: counts[i] for i, name in enumerate(names)}
+    data["labels"] = days.astype("datetime64[D]")
+    return {"data": data}
+
+
+def packed_arrays(body):
+    """Returns (series names, int32 days, int32 series x days matrix) as views over the buffer."""
+    if len(body) < PACKED_HEADER.size:
+        raise ValueError("Packed body is shorter than its header")
+    magic, version, n_series, n_days = PACKED_HEADER.unpack_from(body)
+    if magic != PACKED_MAGIC or version != PACKED_VERSION:
+        raise ValueError("Not a packed attendance body (bad magic or version)")
+
+    offset = PACKED_HEADER.size
+    names = []
+    for _ in range(n_series):
+        name = bytes(body[offset:offset + PACKED_NAME_SIZE]).rstrip(b"\0").decode("ascii")
+        names.append(name)
+        offset += PACKED_NAME_SIZE
+
+    expected = offset + 4 * n_days * (n_series + 1)
+    if len(body) != expected:
+        raise ValueError(f"Packed body should be {expected} bytes, got {len(body)}")
+
+    days = np.frombuffer(body, dtype="<i4", count=n_days, offset=offset)
+    counts = np.frombuffer(body, dtype="<i4", count=n_days * n_series, offset=offset + 4 * n_days)
+    return names, days, counts.reshape(n_series, n_days)
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise ValueError("Arrow and Parquet bodies require the optional pyarrow package")
+    return pyarrow
+
+
+def table_payload(table):
+    """Converts an Arrow table into the payload shape, avoiding copies where Arrow allows."""
+    pa = _require_pyarrow()
+    date_column = "date" if "date" in table.column_names else "labels"
+    if date_column not in table.column_names:
+        raise ValueError("Columnar body needs a 'date' or 'labels' column")
+
+    dates = table.column(date_column).combine_chunks()
+    if pa.types.is_string(dates.type) or pa.types.is_large_string(dates.type):
+        dates = dates.cast(pa.timestamp("s"))
+    dates = dates.cast(pa.date32()).cast(pa.int32())
+
+    data = {"labels": dates.to_numpy(zero_copy_only=False).astype("datetime64[D]")}
+    for name in table.column_names:
+        if name == date_column:
+            continue
+        column = table.column(name).combine_chunks()
+        if column.null_count:
+            raise ValueError(f"Column '{name}' contains nulls")
+        data[name] = column.to_numpy(zero_copy_only=False)
+    return {"data": data}
+
+
+def read_arrow(body):
+    pa = _require_pyarrow()
+    import pyarrow.ipc
+
+    reader = pa.ipc.open_file(pa.py_buffer(body)) if bytes(body[:6]) == b"ARROW1" else pa.ipc.open_stream(pa.py_buffer(body))
+    return table_payload(reader.read_all())
+
+
+def read_parquet(body):
+    pa = _require_pyarrow()
+    import pyarrow.parquet
+
+    return table_payload(pyarrow.parquet.read_table(pa.BufferReader(body)))
+
+
+COLUMNAR_READERS = {
+    PACKED_CONTENT_TYPE: read_packed,
+    "application/vnd.apache.arrow.stream": read_arrow,
+    "application/vnd.apache.arrow.file": read_arrow,
+    "application/vnd.apache.parquet": read_parquet,
+    "application/x-parquet": read_parquet,
+}
+
+
+def columnar_reader(mimetype):
+    """Returns the reader for a columnar Content-Type, or None for JSON and anything else."""
+    return COLUMNAR_READERS.get(mimetype)
+
+
+def write_arrow(labels, series, file_format=False):
+    """Encodes labels and series as an Arrow IPC stream (or file) for clients and benchmarks."""
+    pa = _require_pyarrow()
+    import pyarrow.ipc
+
+    table = pa.table({"date": pa.array(np.asarray(labels, dtype="datetime64[D]")), **series})
+    sink = io.BytesIO()
+    writer = pa.ipc.new_file(sink, table.schema) if file_format else pa.ipc.new_stream(sink, table.schema)
+    with writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+
+def write_parquet(labels, series):
+    pa = _require_pyarrow()
+    import pyarrow.parquet
+
+    table = pa.table({"date": pa.array(np.asarray(labels, dtype="datetime64[D]")), **series})
+    sink = io.BytesIO()
+    pyarrow.parquet.write_table(table, sink)
+    return sink.getvalue()
@@ -0,0 +1,88 @@
+import functools
+from collections import namedtuple
+
+import numpy as np
+
+WEEKDAY_NAMES = np.array(["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"])
+
+# Per-day arrays and bucket metadata derived once per date range:
+# days          datetime64[D] dates
+# date_strings  "%Y-%m-%d" labels
+# weekday       Monday=0 .. Sunday=6
+# week          Monday-start week id (same bins as resample("W"))
+# month_index   month offset from first_month (same bins as resample("ME"))
+# month_labels  "%Y-%m" label for every month from first to last, gaps included
+# weekday_order weekdays present, in the alphabetical order groupby(day_name()) yields
+Calendar = namedtuple(
+    "Calendar",
+    "days date_strings weekday week month_index first_month n_weeks n_months month_labels weekday_order",
+)
+
+
+def parse_labels(labels):
+    """Parses date labels to datetime64[D].
+
+    ISO "YYYY-MM-DD" labels (with or without a time part) go through NumPy's
+    fixed-format parser; anything else falls back to pd.to_datetime.
+    """
+    if isinstance(labels, np.ndarray) and labels.dtype.kind == "M":
+        return labels.astype("datetime64[D]", copy=False)
+    try:
+        return np.array(labels, dtype="datetime64[D]")
+    except (ValueError, TypeError):
+        import pandas as pd
+
+        return np.asarray(pd.to_datetime(labels).values, dtype="datetime64[D]")
+
+
+def calendar_for(days):
+    """Returns the Calendar for parsed days, memoized when they form a contiguous range."""
+    days = np.asarray(days, dtype="datetime64[D]")
+    if len(days) == 0:
+        return build_calendar(days)
+    day_numbers = days.astype(np.int64)
+    start = int(day_numbers[0])
+    if int(day_numbers[-1]) - start == len(days) - 1 and np.all(np.diff(day_numbers) == 1):
+        return calendar_range(start, len(days))
+    return build_calendar(days)
+
+
+@functools.lru_cache(maxsize=256)
+def calendar_range(start, length):
+    """Calendar for `length` consecutive days from `start` (days since 1970-01-01)."""
+    calendar = build_calendar(np.arange(start, start + length).astype("datetime64[D]"))
+    for array in calendar:
+        if isinstance(array, np.ndarray):
+            array.setflags(write=False)
+    return calendar
+
+
+def build_calendar(days):
+    day_numbers = days.astype(np.int64)
+    # 1970-01-01 was a Thursday, so shifting by 3 aligns weeks to Mondays
+    weekday = (day_numbers + 3) % 7
+    week = (day_numbers + 3) // 7
+    month = days.astype("datetime64[M]").astype(np.int64)
+
+    if len(days):
+        first_month = int(month.min())
+        n_weeks = int(week.max() - week.min() + 1)
+        n_months = int(month.max()) - first_month + 1
+    else:
+        first_month, n_weeks, n_months = 0, 0, 0
+
+    month_labels = np.datetime_as_string(np.arange(first_month, first_month + n_months).astype("datetime64[M]"))
+    present = np.unique(weekday)
+    return Calendar(
+        days=days,
+        date_strings=np.datetime_as_string(days),
+        weekday=weekday,
+        week=week,
+        month_index=month - first_month,
+        first_month=first_month,
+        n_weeks=n_weeks,
+        n_months=n_months,
+        month_labels=month_labels,
+        weekday_order=present[np.argsort(WEEKDAY_NAMES[present])],
+    )
+
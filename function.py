@@ -1,162 +1,211 @@
-import numpy as np
-import pandas as pd
-from scipy import stats
+import os
 
+import numpy as np
 
-def late_checkins(data):
-    """Analyzes late check-ins with multiple dimensions."""
-    try:
-        dates = pd.to_datetime(data["data"]["labels"])
-        late_checkins = np.array(data["data"]["late_checked_in"])
-        
+import anomalies
+from dates import WEEKDAY_NAMES, Calendar, calendar_for, parse_labels
+from leave_trends_numpy import leave_trends_numpy
+from metrics import stage
 
-        df = pd.DataFrame({
-            "date": dates,
-            "late_checkins": late_checkins,
-            
-        }).set_index("date")
 
-        stats = {
-            "total_late_checkins": int(df["late_checkins"].sum()),
-            "days_with_late_checkins": int((df["late_checkins"] > 0).sum()),
-            "max_consecutive_days": max_consecutive_days(df["late_checkins"]),
-            "checkin_frequency": {
-                "daily_avg": round(df["late_checkins"].mean(), 2),
-                "weekly_avg": round(df["late_checkins"].resample("W").sum().mean(), 2)
-            }
-        }
+# Per-section settings for the daily count series:
+# section -> (payload key, total key, active-days key, frequency key)
+ATTENDANCE_SECTIONS = {
+    "late_checkins": ("late_checked_in", "total_late_checkins", "days_with_late_checkins", "checkin_frequency"),
+    "on_leave": ("on_leave", "total_on_leave", "days_with_leaves", "leave_frequency"),
+    "non_checked_in": ("non_checked_in", "total_non_checked_in", "days_with_non_checked_in", "leave_frequency"),
+    "no_record": ("no_record", "total_no_record", "days_with_no_record", "record_frequency"),
+}
 
-        # 🛠️ FIX: Convert PeriodIndex to string using strftime
-        monthly_trend = df.resample("ME")["late_checkins"].sum()
-        monthly_trend = {key.strftime("%Y-%m") : int(value) for key, value in monthly_trend.items()} 
+ALL_SECTIONS = list(ATTENDANCE_SECTIONS) + ["leave_trends"]
 
-        temporal = {
-            "daily_distribution": df.groupby(df.index.day_name())["late_checkins"].sum().to_dict(),
-            "monthly_trend": monthly_trend
-        }
+# Numeric fields of each plannedUnplannedLeavesTrends row
+LEAVE_TREND_COLUMNS = ['urgent_count', 'planned_count', 'total_leaves', 'urgent_percentage', 'planned_percentage']
 
-        anomalies = find_anomalies(df["late_checkins"])
+LEAVE_TRENDS_ENGINES = ["numpy", "pandas"]
+LEAVE_TRENDS_ENGINE = os.environ.get("LEAVE_TRENDS_ENGINE", "numpy")
 
-        events = {
-            "most_severe_day": df["late_checkins"].idxmax().strftime("%Y-%m-%d"),
-            "recent_occurrence": df[df["late_checkins"] > 0].index[-1].strftime("%Y-%m-%d") if stats["days_with_late_checkins"] > 0 else None
-        }
-
-        return {
-            "basic_statistics": stats,
-            "temporal_patterns": temporal,
-            "anomalies": anomalies,
-            "significant_events": events
-        }
 
+def late_checkins(data, detector=None):
+    """Analyzes late check-ins with multiple dimensions."""
+    try:
+        return analyze_attendance(data, ["late_checkins"], detector)["late_checkins"]
     except Exception as e:
         return {"error": str(e)}
 
 
-def on_leave(data):
+def on_leave(data, detector=None):
     """Analyzes student leave trends with multiple dimensions."""
     try:
-        dates = pd.to_datetime(data["data"]["labels"])
-        on_leave = np.array(data["data"]["on_leave"])
-
-        df = pd.DataFrame({
-            "date": dates,
-            "on_leave": on_leave
-        }).set_index("date")
-
-        stats = {
-            "total_on_leave": int(df["on_leave"].sum()),
-            "days_with_leaves": int((df["on_leave"] > 0).sum()),
-            "max_consecutive_days": max_consecutive_days(df["on_leave"]),
-            "leave_frequency": {
-                "daily_avg": round(df["on_leave"].mean(), 2),
-                "weekly_avg": round(df["on_leave"].resample("W").sum().mean(), 2)
-            }
-        }
-
-        # 🛠️ Fix: Convert PeriodIndex to string using strftime
-        monthly_trend = df.resample("ME")["on_leave"].sum()
-        monthly_trend = {key.strftime("%Y-%m"): int(value) for key, value in monthly_trend.items()}
-
-        temporal = {
-            "daily_distribution": df.groupby(df.index.day_name())["on_leave"].sum().to_dict(),
-            "monthly_trend": monthly_trend
-        }
-
-        anomalies = find_anomalies(df["on_leave"])
-
-        events = {
-            "most_severe_day": df["on_leave"].idxmax().strftime("%Y-%m-%d"),
-            "recent_occurrence": df[df["on_leave"] > 0].index[-1].strftime("%Y-%m-%d") if stats["days_with_leaves"] > 0 else None
-        }
+        return analyze_attendance(data, ["on_leave"], detector)["on_leave"]
+    except Exception as e:
+        return {"error": str(e)}
 
-        return {
-            "basic_statistics": stats,
-            "temporal_patterns": temporal,
-            "anomalies": anomalies,
-            "significant_events": events
-        }
 
+def non_checked_in(data, detector=None):
+    """Analyzes student leave trends with multiple dimensions."""
+    try:
+        return analyze_attendance(data, ["non_checked_in"], detector)["non_checked_in"]
     except Exception as e:
         return {"error": str(e)}
-    
 
-def non_checked_in(data):
-    """Analyzes student leave trends with multiple dimensions."""
+
+def no_record(data, detector=None):
+    """Analyzes days on which students had no attendance record."""
     try:
-        dates = pd.to_datetime(data["data"]["labels"])
-        non_checked_in = np.array(data["data"]["non_checked_in"])
+        return analyze_attendance(data, ["no_record"], detector)["no_record"]
+    except Exception as e:
+        return {"error": str(e)}
 
-        df = pd.DataFrame({
-            "date": dates,
-            "non_checked_in": non_checked_in
-        }).set_index("date")
 
+def analyze(data, sections=None, engine=None, detector=None):
+    """Runs several analyses over one payload, parsing the shared series once.
+
+    `engine` selects the leave_trends implementation and `detector` the
+    anomaly detector (see anomalies.DETECTORS).
+    """
+    anomalies.check_detector(detector)
+    sections = ALL_SECTIONS if sections is None else sections
+    unknown = [section for section in sections if section not in ALL_SECTIONS]
+    if unknown:
+        raise ValueError(f"Unknown sections: {', '.join(unknown)}")
+
+    results = {}
+    attendance = [section for section in sections if section in ATTENDANCE_SECTIONS]
+    if attendance:
+        try:
+            available = [section for section in attendance if ATTENDANCE_SECTIONS[section][0] in data["data"]]
+            results.update({
+                section: {"error": f"Missing '{ATTENDANCE_SECTIONS[section][0]}' series"}
+                for section in attendance if section not in available
+            })
+            if available:
+                results.update(analyze_attendance(data, available, detector))
+        except Exception as e:
+            results.update({section: {"error": str(e)} for section in attendance})
+
+    if "leave_trends" in sections:
+        try:
+            results["leave_trends"] = leave_trends(data, engine, detector)
+        except Exception as e:
+            results["leave_trends"] = {"error": str(e)}
+
+    return results
+
+
+def analyze_attendance(data, sections, detector=None):
+    """Analyzes every requested count series of the payload in one vectorized pass."""
+    with stage("attendance.calendar"):
+        calendar = calendar_for(parse_labels(data["data"]["labels"]))
+    with stage("attendance.counts"):
+        counts = np.vstack([np.asarray(data["data"][ATTENDANCE_SECTIONS[section][0]]) for section in sections])
+    return analyze_sections(calendar, counts, sections, detector)
+
+
+def analyze_sections(calendar, counts, sections, detector=None):
+    """Runs the attendance engine on a (sections x days) matrix and names each row's statistics."""
+    with stage("attendance.engine"):
+        columns = analyze_counts(calendar, counts, detector)
+
+    return {section: section_statistics(section, column) for section, column in zip(sections, columns)}
+
+
+def section_statistics(section, column):
+    """Renames the generic basic_statistics keys of an analyze_counts result to the section's own."""
+    _, total_key, days_key, frequency_key = ATTENDANCE_SECTIONS[section]
+    stats = column["basic_statistics"]
+    column["basic_statistics"] = {
+        total_key: stats["total"],
+        days_key: stats["active_days"],
+        "max_consecutive_days": stats["max_consecutive_days"],
+        frequency_key: stats["frequency"],
+    }
+    return column
+
+
+def analyze_counts(calendar, counts, detector=None):
+    """Computes the attendance statistics for a (series x days) count matrix.
+
+    `calendar` is a dates.Calendar (or anything parse_labels accepts). Every
+    statistic is computed for all rows at once; the result is one analysis
+    dict per row, in the same shape late_checkins returns. `detector` names
+    the anomaly detector (default: anomalies.DEFAULT_DETECTOR).
+    """
+    if not isinstance(calendar, Calendar):
+        calendar = calendar_for(parse_labels(calendar))
+    counts = np.atleast_2d(counts)
+    n_series, n_days = counts.shape
+    if len(calendar.days) != n_days:
+        raise ValueError(f"Expected {len(calendar.days)} values per series, got {n_days}")
+    if n_days == 0:
+        raise ValueError("attempt to get argmax of an empty sequence")
+
+    date_strings = calendar.date_strings
+    n_months = calendar.n_months
+
+    positive = counts > 0
+    totals = counts.sum(axis=1)
+    active_days = positive.sum(axis=1)
+    streaks = max_streaks(positive)
+    daily_avg = counts.mean(axis=1)
+    weekly_avg = totals / calendar.n_weeks
+
+    # One bincount per bucket type for all rows: offset each row into its own block
+    rows = np.arange(n_series)[:, None]
+    by_weekday = np.bincount((rows * 7 + calendar.weekday).ravel(), weights=counts.ravel(), minlength=n_series * 7)
+    by_weekday = by_weekday.reshape(n_series, 7)
+    by_month = np.bincount((rows * n_months + calendar.month_index).ravel(), weights=counts.ravel(), minlength=n_series * n_months)
+    by_month = by_month.reshape(n_series, n_months)
+
+    # Anomaly thresholds for every row from one batched detector call
+    anomaly_reports = anomalies.anomaly_reports(counts, calendar, detector)
+
+    most_severe = counts.argmax(axis=1)
+    recent = n_days - 1 - positive[:, ::-1].argmax(axis=1)
+
+    results = []
+    for i in range(n_series):
         stats = {
-            "total_non_checked_in": int(df["non_checked_in"].sum()),
-            "days_with_non_checked_in": int((df["non_checked_in"] > 0).sum()),
-            "max_consecutive_days": max_consecutive_days(df["non_checked_in"]),
-            "leave_frequency": {
-                "daily_avg": round(df["non_checked_in"].mean(), 2),
-                "weekly_avg": round(df["non_checked_in"].resample("W").sum().mean(), 2)
+            "total": int(totals[i]),
+            "active_days": int(active_days[i]),
+            "max_consecutive_days": int(streaks[i]),
+            "frequency": {
+                "daily_avg": round(daily_avg[i], 2),
+                "weekly_avg": round(weekly_avg[i], 2)
             }
         }
 
-        # 🛠️ Fix: Convert PeriodIndex to string using strftime
-        monthly_trend = df.resample("ME")["non_checked_in"].sum()
-        monthly_trend = {key.strftime("%Y-%m"): int(value) for key, value in monthly_trend.items()}
-
         temporal = {
-            "daily_distribution": df.groupby(df.index.day_name())["non_checked_in"].sum().to_dict(),
-            "monthly_trend": monthly_trend
+            "daily_distribution": {WEEKDAY_NAMES[d]: int(by_weekday[i, d]) for d in calendar.weekday_order},
+            "monthly_trend": dict(zip(calendar.month_labels.tolist(), by_month[i].astype(np.int64).tolist()))
         }
 
-        anomalies = find_anomalies(df["non_checked_in"])
 
         events = {
-            "most_severe_day": df["non_checked_in"].idxmax().strftime("%Y-%m-%d"),
-            "recent_occurrence": df[df["non_checked_in"] > 0].index[-1].strftime("%Y-%m-%d") if stats["days_with_non_checked_in"] > 0 else None
+            "most_severe_day": str(date_strings[most_severe[i]]),
+            "recent_occurrence": str(date_strings[recent[i]]) if active_days[i] > 0 else None
         }
 
-        return {
+        results.append({
             "basic_statistics": stats,
             "temporal_patterns": temporal,
-            "anomalies": anomalies,
+            "anomalies": anomaly_reports[i],
             "significant_events": events
-        }
+        })
+    return results
 
-    except Exception as e:
-        return {"error": str(e)}
-    
-    
+
+def max_streaks(mask):
+    """Longest run of True values along the last axis, for each row."""
+    mask = np.atleast_2d(mask)
+    running = np.cumsum(mask, axis=1)
+    # Cumulative count at the last False before each position marks where the run started
+    run_start = np.maximum.accumulate(np.where(mask, 0, running), axis=1)
+    return (running - run_start).max(axis=1, initial=0)
 
 
 def max_consecutive_days(series):
-    count = max_count = 0
-    for val in series:
-        count = count + 1 if val > 0 else 0
-        max_count = max(max_count, count)
-    return max_count
+    return int(max_streaks(np.asarray(series) > 0)[0])
 
 def find_anomalies(series):
     # Using IQR for non-normal distribution
@@ -171,36 +220,51 @@ def find_anomalies(series):
     }
 
 
-import numpy as np
-import pandas as pd
-from scipy import stats
 
-def leave_trends(data):
-    """Analyzes planned and unplanned leave trends from JSON data."""
+def leave_trends(data, engine=None, detector=None):
+    """Analyzes planned and unplanned leave trends from JSON data.
+
+    `engine` is "numpy" (the pandas-free fast path) or "pandas"; both return
+    the same result. Defaults to LEAVE_TRENDS_ENGINE.
+    """
+    engine = engine or LEAVE_TRENDS_ENGINE
+    if engine == "numpy":
+        return leave_trends_numpy(data, detector)
+    if engine != "pandas":
+        raise ValueError(f"Unknown leave_trends engine: {engine}")
+    return leave_trends_pandas(data, detector)
+
+
+def leave_trends_pandas(data, detector=None):
+    """Analyzes planned and unplanned leave trends with pandas."""
+    # Imported here so workers that only use the NumPy paths never load pandas
+    import pandas as pd
     
     # Convert JSON to DataFrame
-    df = pd.DataFrame(data["data"]["plannedUnplannedLeavesTrends"])
-    df['date'] = pd.to_datetime(df['date'])
-    df = df.set_index('date').sort_index()
-    
-    # Convert numeric columns to float
-    numeric_cols = ['urgent_count', 'planned_count', 'total_leaves', 'urgent_percentage', 'planned_percentage']
-    df[numeric_cols] = df[numeric_cols].astype(float)
+    with stage("leave_trends.frame"):
+        df = pd.DataFrame(data["data"]["plannedUnplannedLeavesTrends"])
+        df['date'] = pd.to_datetime(df['date'])
+        df = df.set_index('date').sort_index()
 
-    # Avoid division errors
-    df['urgent_ratio'] = df['urgent_count'] / (df['total_leaves'] + 1e-6)
-    df['planning_efficiency'] = df['planned_count'] / (df['planned_count'] + df['urgent_count'] + 1e-6)
+        # Convert numeric columns to float
+        df[LEAVE_TREND_COLUMNS] = df[LEAVE_TREND_COLUMNS].astype(float)
+
+        # Avoid division errors
+        df['urgent_ratio'] = df['urgent_count'] / (df['total_leaves'] + 1e-6)
+        df['planning_efficiency'] = df['planned_count'] / (df['planned_count'] + df['urgent_count'] + 1e-6)
 
     # Perform analysis
-    analysis = {
-        "basic_stats": get_basic_stats(df),
-        "temporal_patterns": temporal_analysis(df),
-        "anomalies": detect_anomalies(df),
-       
-        "significant_events": identify_significant_events(df),
-        "correlation_analysis": calculate_correlations(df),
-        "percentage_distribution": analyze_percentages(df)
-    }
+    analysis = {}
+    for key, section in [
+        ("basic_stats", get_basic_stats),
+        ("temporal_patterns", temporal_analysis),
+        ("anomalies", lambda df: detect_anomalies(df, detector)),
+        ("significant_events", identify_significant_events),
+        ("correlation_analysis", calculate_correlations),
+        ("percentage_distribution", analyze_percentages),
+    ]:
+        with stage(f"leave_trends.{key}"):
+            analysis[key] = section(df)
 
     return analysis
 
@@ -237,7 +301,12 @@ def temporal_analysis(df):
     }
 
 
-def detect_anomalies(df):
+def detect_anomalies(df, detector=None):
+    if anomalies.check_detector(detector) != "iqr":
+        counts = df[['urgent_count', 'planned_count']].to_numpy().T
+        urgent, planned = anomalies.leave_anomaly_reports(counts, calendar_for(df.index.values), detector)
+        return {"urgent_anomalies": urgent, "planned_anomalies": planned}
+
     def find_iqr_anomalies(series):
         q1 = series.quantile(0.25)
         q3 = series.quantile(0.75)
@@ -266,11 +335,12 @@ def identify_significant_events(df):
     }
 
 def get_max_percentage_event(df, col):
-    max_row = df[col].idxmax()
+    # By position, so a date that appears twice still selects a single row
+    max_row = df.iloc[df[col].reset_index(drop=True).idxmax()]
     return {
-        "date": max_row.strftime("%Y-%m-%d"),
-        "percentage": round(float(df.loc[max_row, col]), 2),
-        "total_leaves": int(df.loc[max_row, 'total_leaves'])
+        "date": max_row.name.strftime("%Y-%m-%d"),
+        "percentage": round(float(max_row[col]), 2),
+        "total_leaves": int(max_row['total_leaves'])
     }
 
 def get_unexpected_events(df):
@@ -0,0 +1,11 @@
+# gunicorn -c gunicorn.conf.py app:app
+#
+# The master imports the app and every analysis module (NumPy, pandas)
+# before forking, so workers start warm and share those pages copy-on-write.
+import os
+
+os.environ.setdefault("ANALYSIS_PRELOAD", "1")
+
+preload_app = True
+bind = os.environ.get("BIND", "0.0.0.0:3000")
+workers = int(os.environ.get("WEB_CONCURRENCY", os.cpu_count() or 1))
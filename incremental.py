@@ -0,0 +1,330 @@
+import os
+import pickle
+import threading
+import uuid
+from collections import defaultdict
+from datetime import date
+
+import numpy as np
+
+from dates import WEEKDAY_NAMES
+from function import ATTENDANCE_SECTIONS
+from sqlite_local import LocalConnections
+
+DATASETS_PATH = os.environ.get("ANALYSIS_DATASETS_PATH", "datasets.db")
+
+
+class CountQuantiles:
+    """Exact quantiles over integer counts, kept as a value -> frequency histogram.
+
+    Daily attendance counts take few distinct values, so updates are O(1) and a
+    quantile query walks the distinct values instead of sorting the history.
+    Interpolation matches np.quantile's default (linear) method.
+    """
+
+    def __init__(self):
+        self.frequencies = defaultdict(int)
+        self.n = 0
+
+    def add(self, value):
+        self.frequencies[value] += 1
+        self.n += 1
+
+    def quantiles(self, qs):
+        values = sorted(self.frequencies)
+        cumulative = np.cumsum([self.frequencies[value] for value in values])
+        results = []
+        for q in qs:
+            position = (self.n - 1) * q
+            lower = int(np.floor(position))
+            upper = min(lower + 1, self.n - 1)
+            a = values[np.searchsorted(cumulative, lower, side="right")]
+            b = values[np.searchsorted(cumulative, upper, side="right")]
+            t = position - lower
+            diff = np.float64(b) - np.float64(a)
+            results.append(b - diff * (1 - t) if t >= 0.5 else a + diff * t)
+        return results
+
+
+class RunningSeries:
+    """Running aggregates for one daily count series."""
+
+    def __init__(self):
+        self.total = 0
+        self.active_days = 0
+        self.current_streak = 0
+        self.max_streak = 0
+        self.max_value = None
+        self.most_severe_day = None
+        self.recent_occurrence = None
+        self.weekly = defaultdict(int)
+        self.monthly = defaultdict(int)
+        self.weekday = [0] * 7
+        self.quantiles = CountQuantiles()
+        # Day positions per value, so anomalies can be listed for any threshold
+        self.positions = defaultdict(list)
+
+    def append(self, position, day, label, value):
+        self.total += value
+        if value > 0:
+            self.active_days += 1
+            self.current_streak += 1
+            self.max_streak = max(self.max_streak, self.current_streak)
+            self.recent_occurrence = label
+        else:
+            self.current_streak = 0
+        if self.max_value is None or value > self.max_value:
+            self.max_value = value
+            self.most_severe_day = label
+
+        self.weekly[(day.toordinal() - 1) // 7] += value
+        self.monthly[(day.year, day.month)] += value
+        self.weekday[day.weekday()] += value
+        self.quantiles.add(value)
+        self.positions[value].append(position)
+
+
+class AttendanceDataset:
+    """A growing attendance history whose analysis is maintained as days are appended."""
+
+    def __init__(self, sections):
+        unknown = [section for section in sections if section not in ATTENDANCE_SECTIONS]
+        if unknown:
+            raise ValueError(f"Unknown sections: {', '.join(unknown)}")
+        if not sections:
+            raise ValueError("A dataset needs at least one count series")
+        self.sections = list(sections)
+        self.series = {section: RunningSeries() for section in self.sections}
+        self.labels = []
+        self.weekdays_seen = [False] * 7
+        self.first_day = None
+        self.last_day = None
+        self.lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_payload(cls, data):
+        """Creates a dataset from a data.json-shaped payload, tracking every count series it has."""
+        series = data.get("data", data)
+        sections = [section for section, spec in ATTENDANCE_SECTIONS.items() if spec[0] in series]
+        dataset = cls(sections)
+        if series.get("labels"):
+            dataset.append(series)
+        return dataset
+
+    def append(self, series):
+        """Appends days given as {"labels": [...], "<series>": [...]}; labels must follow the last day.
+
+        Every value is checked before anything changes, so a rejected append
+        leaves the dataset as it was.
+        """
+        labels = series["labels"]
+        columns = {}
+        for section in self.sections:
+            key = ATTENDANCE_SECTIONS[section][0]
+            if key not in series:
+                raise ValueError(f"Missing '{key}' series")
+            if len(series[key]) != len(labels):
+                raise ValueError(f"Expected {len(labels)} values for '{key}', got {len(series[key])}")
+            columns[section] = count_values(key, series[key])
+
+        days = [date.fromisoformat(str(label)[:10]) for label in labels]
+
+        with self.lock:
+            previous = self.last_day
+            for day in days:
+                if previous is not None and day <= previous:
+                    raise ValueError(f"Appended dates must be after {previous.isoformat()}, got {day.isoformat()}")
+                previous = day
+
+            for i, day in enumerate(days):
+                position = len(self.labels)
+                label = day.isoformat()
+                self.labels.append(label)
+                self.weekdays_seen[day.weekday()] = True
+                for section in self.sections:
+                    self.series[section].append(position, day, label, columns[section][i])
+            if days:
+                self.first_day = self.first_day or days[0]
+                self.last_day = days[-1]
+        return len(days)
+
+    def __len__(self):
+        return len(self.labels)
+
+    def analysis(self, sections=None):
+        """Returns the same analysis late_checkins/on_leave/non_checked_in/no_record produce.
+
+        basic_statistics also has "current_consecutive_days", the streak
+        ending on the last appended day.
+        """
+        sections = self.sections if sections is None else sections
+        unknown = [section for section in sections if section not in self.sections]
+        if unknown:
+            raise ValueError(f"Sections not tracked by this dataset: {', '.join(unknown)}")
+        with self.lock:
+            if not self.labels:
+                raise ValueError("Dataset has no days yet")
+            return {section: self._section_analysis(section) for section in sections}
+
+    def _section_analysis(self, section):
+        _, total_key, days_key, frequency_key = ATTENDANCE_SECTIONS[section]
+        running = self.series[section]
+        n_days = len(self.labels)
+        first_week = (self.first_day.toordinal() - 1) // 7
+        last_week = (self.last_day.toordinal() - 1) // 7
+
+        stats = {
+            total_key: int(running.total),
+            days_key: running.active_days,
+            "max_consecutive_days": running.max_streak,
+            "current_consecutive_days": running.current_streak,
+            frequency_key: {
+                "daily_avg": round(np.float64(running.total / n_days), 2),
+                "weekly_avg": round(np.float64(running.total / (last_week - first_week + 1)), 2)
+            }
+        }
+
+        weekday_order = sorted((d for d in range(7) if self.weekdays_seen[d]), key=lambda d: WEEKDAY_NAMES[d])
+        temporal = {
+            "daily_distribution": {WEEKDAY_NAMES[d]: int(running.weekday[d]) for d in weekday_order},
+            "monthly_trend": {
+                f"{year:04d}-{month:02d}": int(running.monthly.get((year, month), 0))
+                for year, month in month_range(self.first_day, self.last_day)
+            }
+        }
+
+        q1, q3 = running.quantiles.quantiles([0.25, 0.75])
+        threshold = q3 + 1.5 * (q3 - q1)
+        anomalous = sorted(
+            (position, value)
+            for value, value_positions in running.positions.items() if value > threshold
+            for position in value_positions
+        )
+        anomalies = {
+            "threshold": threshold,
+            "anomalous_dates": [self.labels[position] for position, _ in anomalous],
+            "values": [value for _, value in anomalous]
+        }
+
+        events = {
+            "most_severe_day": running.most_severe_day,
+            "recent_occurrence": running.recent_occurrence
+        }
+
+        return {
+            "basic_statistics": stats,
+            "temporal_patterns": temporal,
+            "anomalies": anomalies,
+            "significant_events": events
+        }
+
+
+def count_values(key, values):
+    """The values of a count series as ints; raises ValueError for anything that is not a whole number."""
+    counts = []
+    for i, value in enumerate(values):
+        try:
+            count = int(value)
+            if count != float(value):
+                raise ValueError
+        except (TypeError, ValueError):
+            raise ValueError(f"Value {i} of '{key}' is not a count: {value!r}")
+        counts.append(count)
+    return counts
+
+
+def month_range(first_day, last_day):
+    year, month = first_day.year, first_day.month
+    while (year, month) <= (last_day.year, last_day.month):
+        yield year, month
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+class DatasetStore:
+    """Incremental datasets in a SQLite file shared by every worker process.
+
+    Each dataset is stored pickled with a version number. A worker keeps
+    the last version it loaded and reloads a dataset only after another
+    worker changed it. An append reads, updates and writes its dataset in
+    one IMMEDIATE transaction, so concurrent appends are serialized.
+    """
+
+    def __init__(self, path=DATASETS_PATH):
+        self.path = path
+        # Autocommit mode, so append() can open its own IMMEDIATE transaction
+        self._connections = LocalConnections(path, isolation_level=None)
+        self._loaded = {}
+        self._lock = threading.Lock()
+        self._connections.create_schema(
+            "CREATE TABLE IF NOT EXISTS datasets ("
+            "id TEXT PRIMARY KEY, version INTEGER NOT NULL, state BLOB NOT NULL)"
+        )
+
+    def _load(self, conn, dataset_id):
+        """(version, dataset) as stored, reusing this worker's copy when it is current."""
+        row = conn.execute("SELECT version FROM datasets WHERE id = ?", (dataset_id,)).fetchone()
+        if row is None:
+            with self._lock:
+                self._loaded.pop(dataset_id, None)
+            return None, None
+        with self._lock:
+            loaded = self._loaded.get(dataset_id)
+        if loaded is not None and loaded[0] == row[0]:
+            return loaded
+        version, state = conn.execute("SELECT version, state FROM datasets WHERE id = ?", (dataset_id,)).fetchone()
+        loaded = (version, pickle.loads(state))
+        with self._lock:
+            self._loaded[dataset_id] = loaded
+        return loaded
+
+    def create(self, data):
+        dataset = AttendanceDataset.from_payload(data)
+        dataset_id = uuid.uuid4().hex
+        self._connections.connect().execute(
+            "INSERT INTO datasets (id, version, state) VALUES (?, 1, ?)", (dataset_id, pickle.dumps(dataset))
+        )
+        with self._lock:
+            self._loaded[dataset_id] = (1, dataset)
+        return dataset_id, dataset
+
+    def get(self, dataset_id):
+        return self._load(self._connections.connect(), dataset_id)[1]
+
+    def append(self, dataset_id, series):
+        """Appends days to a stored dataset; returns (days appended, dataset) or None if it does not exist."""
+        conn = self._connections.connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            version, dataset = self._load(conn, dataset_id)
+            if dataset is None:
+                conn.execute("ROLLBACK")
+                return None
+            appended = dataset.append(series)
+            conn.execute(
+                "UPDATE datasets SET version = ?, state = ? WHERE id = ?",
+                (version + 1, pickle.dumps(dataset), dataset_id),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            # The in-memory copy may be ahead of the stored one; reload it next time
+            with self._lock:
+                self._loaded.pop(dataset_id, None)
+            raise
+        with self._lock:
+            self._loaded[dataset_id] = (version + 1, dataset)
+        return appended, dataset
+
+    def delete(self, dataset_id):
+        with self._lock:
+            self._loaded.pop(dataset_id, None)
+        return self._connections.connect().execute("DELETE FROM datasets WHERE id = ?", (dataset_id,)).rowcount > 0
@@ -0,0 +1,34 @@
+import importlib
+
+
+class LazyModule:
+    """Stand-in for a module that imports it on first attribute access.
+
+    importlib's module locks make the first import safe when several request
+    threads hit a cold worker at once.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        module = self._module
+        if module is None:
+            module = self._module = importlib.import_module(self._name)
+        return getattr(module, attr)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+def lazy_import(name):
+    """Returns a LazyModule for `name`; nothing is imported until it is used."""
+    return LazyModule(name)
+
+
+def preload(*names):
+    """Fully imports the named modules, e.g. in a pre-fork master so workers share them."""
+    for name in names:
+        importlib.import_module(name)
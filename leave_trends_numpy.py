@@ -0,0 +1,184 @@
+import numpy as np
+
+import anomalies
+from dates import WEEKDAY_NAMES, calendar_for, parse_labels
+from metrics import stage
+
+# Row order of the decoded matrix; matches function.LEAVE_TREND_COLUMNS
+URGENT, PLANNED, TOTAL, URGENT_PCT, PLANNED_PCT = range(5)
+COLUMNS = ['urgent_count', 'planned_count', 'total_leaves', 'urgent_percentage', 'planned_percentage']
+
+
+def decode_rows(rows):
+    """Decodes plannedUnplannedLeavesTrends rows into date-sorted days and a (5 x days) float matrix.
+
+    Null or missing fields become NaN, as in the pandas frame; a field that
+    no row has is a KeyError there too.
+    """
+    if not rows:
+        raise ValueError("plannedUnplannedLeavesTrends is empty")
+    days = parse_labels([row['date'] for row in rows])
+    values = np.ascontiguousarray(np.array([[row.get(column) for column in COLUMNS] for row in rows], dtype=float).T)
+    missing = [
+        COLUMNS[i] for i in np.flatnonzero(np.isnan(values).all(axis=1))
+        if not any(COLUMNS[i] in row for row in rows)
+    ]
+    if missing:
+        raise KeyError(f"{missing} not in index")
+
+    # Like DataFrame.sort_index: sorted input is kept as is, otherwise a quicksort
+    # (not stable) decides the order of rows sharing a date
+    if (np.diff(days) < np.timedelta64(0)).any():
+        order = np.argsort(days, kind="quicksort")
+        days, values = days[order], np.ascontiguousarray(values[:, order])
+    return days, values
+
+
+def leave_trends_numpy(data, detector=None):
+    """NumPy implementation of leave_trends with identical output and no pandas calls.
+
+    Every section is computed from one decoded matrix: column sums, means and
+    argmaxes are single reductions, both IQR fences come from one quantile
+    call and the three correlations from one correlation matrix. NaN values
+    are skipped like pandas does.
+    """
+    with stage("leave_trends.decode"):
+        days, values = decode_rows(data["data"]["plannedUnplannedLeavesTrends"])
+    return leave_trends_matrix(days, values, detector)
+
+
+def leave_trends_matrix(days, values, detector=None):
+    """leave_trends from date-sorted days and the (5 x days) matrix decode_rows returns."""
+    with stage("leave_trends.numpy"):
+        calendar = calendar_for(days)
+        dates = calendar.date_strings
+        n_days = values.shape[1]
+
+        has_nan = np.isnan(values).any(axis=1)
+        sums = np.nansum(values, axis=1)
+        with np.errstate(invalid="ignore"):
+            means = sums / (n_days - np.isnan(values).sum(axis=1))
+        argmax = np.array([np.nanargmax(row) if row_has_nan else row.argmax() for row, row_has_nan in zip(values, has_nan)])
+
+        counts = values[[URGENT, PLANNED]]
+        # Grouped sums skip missing counts
+        weights = np.nan_to_num(counts, nan=0.0).ravel()
+        n_months = calendar.n_months
+        rows = np.arange(2)[:, None]
+        by_weekday = np.bincount((rows * 7 + calendar.weekday).ravel(), weights=weights, minlength=14).reshape(2, 7)
+        by_month = np.bincount((rows * n_months + calendar.month_index).ravel(), weights=weights, minlength=2 * n_months).reshape(2, n_months)
+
+        urgent_anomalies, planned_anomalies = anomalies.leave_anomaly_reports(counts, calendar, detector)
+
+        if n_days > 1:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                if has_nan[[URGENT, PLANNED, TOTAL]].any():
+                    correlations = pairwise_correlations(values[[URGENT, PLANNED, TOTAL]])
+                else:
+                    correlations = np.corrcoef(values[[URGENT, PLANNED, TOTAL]])
+                std_devs = np.array([
+                    nan_std(values[column]) if has_nan[column] else values[column].std(ddof=1)
+                    for column in (URGENT_PCT, PLANNED_PCT)
+                ])
+        else:
+            # Undefined for a single day, as in pandas
+            correlations = np.full((3, 3), np.nan)
+            std_devs = np.full(2, np.nan)
+
+        unexpected = np.flatnonzero(values[URGENT_PCT] > 70)
+
+        weekday_names = [str(WEEKDAY_NAMES[d]) for d in calendar.weekday_order]
+        month_labels = calendar.month_labels.tolist()
+
+        def max_percentage_event(column):
+            i = argmax[column]
+            return {
+                "date": str(dates[i]),
+                "percentage": round(float(values[column, i]), 2),
+                "total_leaves": int(values[TOTAL, i])
+            }
+
+        return {
+            "basic_stats": {
+                "total_leaves": int(sums[TOTAL]),
+                "avg_daily_leaves": round(means[TOTAL], 2),
+                "max_leaves_day": {
+                    "date": str(dates[argmax[TOTAL]]),
+                    "count": int(values[TOTAL, argmax[TOTAL]])
+                },
+                "urgent_leaves": {
+                    "total": int(sums[URGENT]),
+                    "daily_avg": round(means[URGENT], 2),
+                    "max_day": str(dates[argmax[URGENT]])
+                },
+                "planned_leaves": {
+                    "total": int(sums[PLANNED]),
+                    "daily_avg": round(means[PLANNED], 2),
+                    "max_day": str(dates[argmax[PLANNED]])
+                }
+            },
+            "temporal_patterns": {
+                "daily_patterns": {
+                    "by_weekday": {
+                        column: dict(zip(weekday_names, by_weekday[i, calendar.weekday_order].tolist()))
+                        for i, column in enumerate(COLUMNS[:2])
+                    },
+                    "by_month": {
+                        month: {"urgent_count": float(by_month[0, j]), "planned_count": float(by_month[1, j])}
+                        for j, month in enumerate(month_labels)
+                    }
+                },
+            },
+            "anomalies": {
+                "urgent_anomalies": urgent_anomalies,
+                "planned_anomalies": planned_anomalies
+            },
+            "significant_events": {
+                "highest_urgent_percentage": max_percentage_event(URGENT_PCT),
+                "highest_planned_percentage": max_percentage_event(PLANNED_PCT),
+                "most_unexpected_urgent": [{
+                    "date": str(dates[i]),
+                    "urgent_percentage": round(float(values[URGENT_PCT, i]), 2),
+                    "total_leaves": int(values[TOTAL, i])
+                } for i in unexpected]
+            },
+            "correlation_analysis": {
+                "urgent_vs_planned": round(correlations[0, 1], 3),
+                "urgent_vs_total": round(correlations[0, 2], 3),
+                "planned_vs_total": round(correlations[1, 2], 3)
+            },
+            "percentage_distribution": {
+                "urgent_percentage": {
+                    "mean": round(means[URGENT_PCT], 2),
+                    "std_dev": round(std_devs[0], 2)
+                },
+                "planned_percentage": {
+                    "mean": round(means[PLANNED_PCT], 2),
+                    "std_dev": round(std_devs[1], 2)
+                }
+            }
+        }
+
+
+def nan_std(values):
+    """Sample standard deviation skipping NaN, summed in the same order as Series.std()."""
+    missing = np.isnan(values)
+    count = len(values) - missing.sum()
+    if count < 2:
+        return np.nan
+    filled = np.where(missing, 0.0, values)
+    squares = (filled.sum() / count - filled) ** 2
+    squares[missing] = 0
+    return np.sqrt(squares.sum() / (count - 1))
+
+
+def pairwise_correlations(values):
+    """Correlation matrix of the rows over the days both rows have, like Series.corr()."""
+    n = len(values)
+    correlations = np.full((n, n), np.nan)
+    for i in range(n):
+        for j in range(i + 1, n):
+            both = ~np.isnan(values[i]) & ~np.isnan(values[j])
+            if both.sum() > 1:
+                correlations[i, j] = correlations[j, i] = np.corrcoef(values[i, both], values[j, both])[0, 1]
+    return correlations
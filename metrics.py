@@ -0,0 +1,163 @@
+"""Opt-in stage timing and Prometheus text-format metrics.
+
+Set ANALYSIS_METRICS=1 to record per-stage latency histograms, request
+payload sizes and request/error counts, exposed by the app at /metrics.
+While metrics are enabled, a request sent with ?timing=1 (or every request
+when ANALYSIS_TIMING_HEADER=1) gets a Server-Timing header listing its
+stages. When disabled, stage() and timed() cost one flag check.
+"""
+import contextlib
+import contextvars
+import functools
+import os
+import threading
+import time
+
+ENABLED = os.environ.get("ANALYSIS_METRICS", "").lower() in ("1", "true", "yes")
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+# Stage timings of the current request, or None outside a timed request
+_request_stages = contextvars.ContextVar("request_stages", default=None)
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self.series = {}
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        counts = self.series.get(key)
+        if counts is None:
+            counts = self.series[key] = [[0] * len(self.buckets), 0.0, 0]
+        bucket_counts = counts[0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                bucket_counts[i] += 1
+        counts[1] += value
+        counts[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for key, (bucket_counts, total, count) in sorted(self.series.items()):
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                lines.append(f"{self.name}_bucket{format_labels(key, le=bound)} {bucket_count}")
+            lines.append(f"{self.name}_bucket{format_labels(key, le='+Inf')} {count}")
+            lines.append(f"{self.name}_sum{format_labels(key)} {total}")
+            lines.append(f"{self.name}_count{format_labels(key)} {count}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self.series = {}
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        self.series[key] = self.series.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self.series.items()):
+            lines.append(f"{self.name}{format_labels(key)} {value}")
+        return lines
+
+
+def format_labels(key, **extra):
+    pairs = list(key) + list(extra.items())
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"') for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+_lock = threading.Lock()
+stage_seconds = Histogram("analysis_stage_seconds", "Time spent in each analysis stage.", LATENCY_BUCKETS)
+request_seconds = Histogram("analysis_request_seconds", "Request latency by endpoint.", LATENCY_BUCKETS)
+payload_bytes = Histogram("analysis_request_payload_bytes", "Request body size by endpoint.", SIZE_BUCKETS)
+requests_total = Counter("analysis_requests_total", "Requests by endpoint and status code.")
+stage_errors = Counter("analysis_stage_errors_total", "Exceptions raised inside an analysis stage.")
+
+
+def record_stage(name, seconds, failed=False):
+    with _lock:
+        stage_seconds.observe(seconds, stage=name)
+        if failed:
+            stage_errors.inc(stage=name)
+    stages = _request_stages.get()
+    if stages is not None:
+        stages.append((name, seconds))
+
+
+@contextlib.contextmanager
+def _timed_stage(name):
+    start = time.perf_counter()
+    failed = False
+    try:
+        yield
+    except Exception:
+        failed = True
+        raise
+    finally:
+        record_stage(name, time.perf_counter() - start, failed)
+
+
+def stage(name):
+    """Context manager timing one pipeline stage when metrics are enabled."""
+    if not ENABLED:
+        return contextlib.nullcontext()
+    return _timed_stage(name)
+
+
+def timed(name):
+    """Decorator form of stage()."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return fn(*args, **kwargs)
+            with _timed_stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def start_request():
+    """Starts collecting stage timings for the current request."""
+    return _request_stages.set([])
+
+
+def finish_request(token, endpoint, status, seconds, size):
+    """Records the request and returns its stage timings."""
+    stages = _request_stages.get() or []
+    _request_stages.reset(token)
+    with _lock:
+        request_seconds.observe(seconds, endpoint=endpoint)
+        if size is not None:
+            payload_bytes.observe(size, endpoint=endpoint)
+        requests_total.inc(endpoint=endpoint, status=status)
+    return stages
+
+
+def server_timing(stages, total):
+    """Formats stage timings as a Server-Timing header value (durations in ms)."""
+    parts = [f"{name.replace('.', '-')};dur={seconds * 1000:.3f}" for name, seconds in stages]
+    parts.append(f"total;dur={total * 1000:.3f}")
+    return ", ".join(parts)
+
+
+def render(extra=None):
+    """Prometheus text exposition of every metric plus extra {name: (type, help, value)} samples."""
+    with _lock:
+        lines = []
+        for metric in (stage_seconds, request_seconds, payload_bytes, requests_total, stage_errors):
+            lines.extend(metric.render())
+    for name, (kind, help_text, value) in (extra or {}).items():
+        lines.extend([f"# HELP {name} {help_text}", f"# TYPE {name} {kind}", f"{name} {value}"])
+    return "\n".join(lines) + "\n"
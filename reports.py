@@ -0,0 +1,290 @@
+"""Offline batch runner for nightly reports.
+
+Analyzes many payloads without going through the HTTP app. Inputs are
+data.json-style files, given as files, directories (every *.json inside)
+or glob patterns, and .jsonl files with one {"hostel_id": ..., "data": {...}}
+payload per line. Each payload is analyzed with its summaries on a process
+pool and written as one record to the output:
+
+    JSONL    {"key": ..., "sha256": ..., "results": {section: {"analysis": ..., "summary": ...}}}
+    Parquet  one row per payload and section: key, sha256, section, summary
+             and analysis (JSON text), and the section's error if it failed
+             (requires pyarrow)
+
+A payload's key is its file path, or for .jsonl lines its hostel_id (path
+and line number when there is none). The manifest next to the output maps
+every key to the SHA-256 of its content and run options. A payload whose
+hash is unchanged since the last run is not analyzed again; its record is
+carried over from the previous output. Failed payloads, and payloads with
+a failed section, are not added to the manifest, so they are retried on the
+next run.
+
+Usage: python reports.py INPUT... [--output reports.jsonl|reports.parquet]
+       [--sections a,b] [--workers N] [--engine numpy|pandas]
+       [--detector iqr|...] [--manifest PATH] [--force]
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from batch import batch_chunk_size, batch_workers
+from function import ALL_SECTIONS, LEAVE_TRENDS_ENGINES, analyze
+from serialization import dumps
+from summary import with_summaries
+
+FORMATS = ["jsonl", "parquet"]
+
+
+def input_files(patterns):
+    """Expands files, directories and glob patterns into a sorted, de-duplicated list of paths."""
+    paths = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            paths.extend(glob.glob(os.path.join(pattern, "*.json")))
+        elif os.path.isfile(pattern):
+            paths.append(pattern)
+        else:
+            matches = glob.glob(pattern, recursive=True)
+            if not matches:
+                raise ValueError(f"No input files match '{pattern}'")
+            paths.extend(matches)
+    return sorted(set(paths))
+
+
+def read_inputs(paths):
+    """Yields (key, raw payload bytes) for every payload in the input files."""
+    seen = set()
+    for path in paths:
+        with open(path, "rb") as f:
+            if not path.endswith(".jsonl"):
+                seen.add(path)
+                yield path, f.read()
+                continue
+            for line_number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    key = json.loads(line).get("hostel_id")
+                except (ValueError, AttributeError):
+                    key = None
+                # Repeated hostel_ids fall back to their line so every key stays unique
+                key = str(key) if key is not None and str(key) not in seen else f"{path}:{line_number}"
+                seen.add(key)
+                yield key, line
+
+
+def content_hash(raw, options):
+    digest = hashlib.sha256(options)
+    digest.update(b"\0")
+    digest.update(raw)
+    return digest.hexdigest()
+
+
+def analyze_raw(item):
+    """Worker: decodes and analyzes one payload; failures stay local to the item."""
+    key, raw, sections, engine, detector = item
+    try:
+        data = json.loads(raw)
+        if not isinstance(data, dict) or "data" not in data:
+            raise ValueError("Expected a data.json-shaped payload")
+        return key, {"results": with_summaries(analyze(data, sections, engine, detector))}
+    except Exception as e:
+        return key, {"error": str(e)}
+
+
+def output_format(path, fmt=None):
+    fmt = fmt or ("parquet" if path.endswith(".parquet") else "jsonl")
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown output format: {fmt}")
+    return fmt
+
+
+def require_parquet():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ValueError("Parquet output requires the optional pyarrow package")
+    return pyarrow, pyarrow.parquet
+
+
+def record_failed(record):
+    """Whether the payload or any of its sections (analysis or summary) failed."""
+    return "error" in record or any(
+        "error" in result["analysis"] or "error" in result["summary"] for result in record["results"].values()
+    )
+
+
+def read_records(path, fmt):
+    """{key: record} of a previous output, or {} if there is none."""
+    if not os.path.exists(path):
+        return {}
+    if fmt == "jsonl":
+        with open(path, "rb") as f:
+            records = (json.loads(line) for line in f if line.strip())
+            return {record["key"]: record for record in records}
+
+    _, parquet = require_parquet()
+    records = {}
+    for row in parquet.read_table(path).to_pylist():
+        record = records.setdefault(row["key"], {"key": row["key"], "sha256": row["sha256"]})
+        if row["section"] is None:
+            record["error"] = row["error"]
+        else:
+            record.setdefault("results", {})[row["section"]] = {
+                "analysis": json.loads(row["analysis"]), "summary": json.loads(row["summary"]),
+            }
+    return records
+
+
+def parquet_rows(record):
+    if "error" in record:
+        yield {"key": record["key"], "sha256": record["sha256"], "section": None, "summary": None, "analysis": None, "error": record["error"]}
+        return
+    for section, result in record["results"].items():
+        yield {
+            "key": record["key"],
+            "sha256": record["sha256"],
+            "section": section,
+            "summary": dumps(result["summary"]).decode("utf-8"),
+            "analysis": dumps(result["analysis"]).decode("utf-8"),
+            "error": result["analysis"].get("error") or result["summary"].get("error"),
+        }
+
+
+def write_records(path, fmt, records):
+    """Writes records to a temporary file and moves it over `path`."""
+    staging = f"{path}.tmp"
+    if fmt == "jsonl":
+        with open(staging, "wb") as f:
+            for record in records:
+                f.write(dumps(record) + b"\n")
+    else:
+        pa, parquet = require_parquet()
+        columns = ["key", "sha256", "section", "summary", "analysis", "error"]
+        rows = [row for record in records for row in parquet_rows(record)]
+        table = pa.table({column: pa.array([row[column] for row in rows], pa.string()) for column in columns})
+        parquet.write_table(table, staging)
+    os.replace(staging, path)
+
+
+def load_manifest(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def run_reports(patterns, output, sections=None, workers=None, engine=None, detector=None,
+                manifest_path=None, fmt=None, force=False, chunksize=None):
+    """Analyzes every changed input and rewrites the output and manifest; returns run statistics."""
+    started = time.perf_counter()
+    fmt = output_format(output, fmt)
+    manifest_path = manifest_path or f"{output}.manifest.json"
+    manifest = {} if force else load_manifest(manifest_path)
+    previous = {} if force else read_records(output, fmt)
+    options = dumps({"sections": sections, "engine": engine, "detector": detector})
+
+    records = {}
+    hashes = {}
+    pending = []
+    stats = {"inputs": 0, "analyzed": 0, "skipped": 0, "failed": 0, "bytes": 0}
+    # The manifest is a .json file too; never read our own files back as inputs
+    own_files = {os.path.abspath(output), os.path.abspath(manifest_path)}
+    paths = [path for path in input_files(patterns) if os.path.abspath(path) not in own_files]
+    for key, raw in read_inputs(paths):
+        stats["inputs"] += 1
+        stats["bytes"] += len(raw)
+        hashes[key] = content_hash(raw, options)
+        if manifest.get(key) == hashes[key] and key in previous:
+            records[key] = previous[key]
+            stats["skipped"] += 1
+        else:
+            records[key] = None
+            pending.append((key, raw, sections, engine, detector))
+
+    workers = batch_workers() if workers is None else workers
+    chunksize = batch_chunk_size() if chunksize is None else chunksize
+    analyze_started = time.perf_counter()
+    if workers <= 1 or len(pending) <= 1:
+        results = map(analyze_raw, pending)
+        executor = None
+    else:
+        executor = ProcessPoolExecutor(max_workers=workers)
+        results = executor.map(analyze_raw, pending, chunksize=max(chunksize, 1))
+    try:
+        for key, result in results:
+            records[key] = {"key": key, "sha256": hashes[key], **result}
+            stats["analyzed"] += 1
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    analyze_s = time.perf_counter() - analyze_started
+
+    new_manifest = {}
+    for key, record in records.items():
+        if record_failed(record):
+            stats["failed"] += 1
+        else:
+            new_manifest[key] = record["sha256"]
+    write_records(output, fmt, records.values())
+    with open(f"{manifest_path}.tmp", "w") as f:
+        json.dump(new_manifest, f, indent=1, sort_keys=True)
+    os.replace(f"{manifest_path}.tmp", manifest_path)
+
+    elapsed = time.perf_counter() - started
+    stats.update({
+        "workers": workers,
+        "elapsed_s": round(elapsed, 3),
+        "analyze_s": round(analyze_s, 3),
+        "payloads_per_s": round(stats["analyzed"] / analyze_s, 1) if analyze_s > 0 else None,
+        "mb_per_s": round(stats["bytes"] / 1e6 / elapsed, 1) if elapsed > 0 else None,
+    })
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyze many payload files offline for nightly reports.")
+    parser.add_argument("inputs", nargs="+", help="data.json-style files, directories, glob patterns or .jsonl files")
+    parser.add_argument("--output", default="reports.jsonl", help="Output file; .parquet writes Parquet (needs pyarrow)")
+    parser.add_argument("--format", choices=FORMATS, help="Output format, overriding the output file extension")
+    parser.add_argument("--sections", help="Comma-separated subset of " + ", ".join(ALL_SECTIONS))
+    parser.add_argument("--workers", type=int, help="Worker processes (default: BATCH_WORKERS or the CPU count)")
+    parser.add_argument("--engine", choices=LEAVE_TRENDS_ENGINES, help="leave_trends engine")
+    parser.add_argument("--detector", help="Anomaly detector (see anomalies.DETECTORS)")
+    parser.add_argument("--manifest", help="Manifest path (default: OUTPUT.manifest.json)")
+    parser.add_argument("--force", action="store_true", help="Analyze every input, ignoring the manifest")
+    args = parser.parse_args(argv)
+
+    sections = [section.strip() for section in args.sections.split(",")] if args.sections else None
+    unknown = [section for section in sections or [] if section not in ALL_SECTIONS]
+    if unknown:
+        parser.error(f"Unknown sections: {', '.join(unknown)}")
+    if args.detector:
+        from anomalies import DETECTORS
+
+        if args.detector not in DETECTORS:
+            parser.error(f"Unknown anomaly detector: {args.detector}")
+
+    try:
+        stats = run_reports(
+            args.inputs, args.output, sections, args.workers, args.engine, args.detector,
+            args.manifest, args.format, args.force,
+        )
+    except ValueError as e:
+        parser.error(str(e))
+    print(
+        f"{stats['inputs']} inputs: {stats['analyzed']} analyzed, {stats['skipped']} unchanged, "
+        f"{stats['failed']} failed in {stats['elapsed_s']} s "
+        f"({stats['payloads_per_s']} payloads/s on {stats['workers']} workers, {stats['mb_per_s']} MB/s read)",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
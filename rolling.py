@@ -0,0 +1,203 @@
+from bisect import bisect_left, insort
+
+import numpy as np
+
+from dates import calendar_range, parse_labels
+from function import ATTENDANCE_SECTIONS
+from metrics import stage
+
+DEFAULT_WINDOWS = [7, 30]
+# Series with more distinct values than this keep a sorted window instead of a histogram
+HISTOGRAM_MAX_VALUES = 256
+
+
+def rolling_analysis(data, windows=None, sections=None):
+    """Trailing-window statistics for every day of the attendance history.
+
+    For each window size w and each day t, the window is the w calendar days
+    ending at t (fewer at the start of the history; missing days count as
+    zero). Returns per-day totals, averages, longest streak of non-zero days
+    and the IQR anomaly threshold and flag of that window, for every
+    requested count series:
+
+        {"dates": [...], "windows": {"7": {"on_leave": {"totals": [...], ...}}}}
+    """
+    windows = DEFAULT_WINDOWS if not windows else windows
+    if any(int(w) < 1 for w in windows):
+        raise ValueError("Window sizes must be positive")
+    sections = [section for section in ATTENDANCE_SECTIONS if ATTENDANCE_SECTIONS[section][0] in data["data"]] if sections is None else sections
+    unknown = [section for section in sections if section not in ATTENDANCE_SECTIONS]
+    if unknown:
+        raise ValueError(f"Rolling analysis supports {', '.join(ATTENDANCE_SECTIONS)}; got {', '.join(unknown)}")
+    if not sections:
+        raise ValueError("No count series to analyze")
+
+    with stage("rolling.densify"):
+        start, counts = dense_counts(
+            parse_labels(data["data"]["labels"]),
+            [np.asarray(data["data"][ATTENDANCE_SECTIONS[section][0]]) for section in sections],
+        )
+        n_days = counts.shape[1]
+
+    with stage("rolling.windows"):
+        cumulative = np.concatenate([np.zeros((len(sections), 1), dtype=counts.dtype), counts.cumsum(axis=1)], axis=1)
+        positive = counts > 0
+        runs = run_lengths(positive)
+        next_zero = next_zero_index(positive)
+        run_table = sparse_max_table(runs)
+
+        results = {}
+        for w in windows:
+            w = int(w)
+            t = np.arange(n_days)
+            lo = np.maximum(t - w + 1, 0)
+            sizes = t - lo + 1
+
+            totals = cumulative[:, t + 1] - cumulative[:, lo]
+            averages = np.round(totals / sizes, 2)
+            streaks = window_streaks(runs, next_zero, run_table, lo, t)
+            thresholds = rolling_iqr_thresholds(counts, w)
+            anomalous = counts > thresholds
+
+            results[str(w)] = {
+                section: {
+                    "totals": totals[i].tolist(),
+                    "averages": averages[i].tolist(),
+                    "max_consecutive_days": streaks[i].tolist(),
+                    "anomaly_thresholds": thresholds[i].tolist(),
+                    "anomalies": anomalous[i].tolist(),
+                }
+                for i, section in enumerate(sections)
+            }
+
+    return {
+        "dates": calendar_range(start, n_days).date_strings.tolist(),
+        "windows": results,
+    }
+
+
+def dense_counts(days, series):
+    """Places each series on a contiguous daily grid, summing duplicate dates and zero-filling gaps."""
+    if len(days) == 0:
+        raise ValueError("No dates to analyze")
+    for values in series:
+        if len(values) != len(days):
+            raise ValueError(f"Expected {len(days)} values per series, got {len(values)}")
+    day_numbers = days.astype(np.int64)
+    start = int(day_numbers.min())
+    n_days = int(day_numbers.max()) - start + 1
+    offsets = day_numbers - start
+    rows = np.arange(len(series))[:, None]
+    values = np.vstack(series)
+    dense = np.bincount((rows * n_days + offsets).ravel(), weights=values.ravel(), minlength=len(series) * n_days)
+    dtype = np.int64 if np.issubdtype(values.dtype, np.integer) else np.float64
+    return start, dense.reshape(len(series), n_days).astype(dtype)
+
+
+def run_lengths(mask):
+    """Length of the run of True values ending at each position (0 where False)."""
+    running = np.cumsum(mask, axis=1)
+    return running - np.maximum.accumulate(np.where(mask, 0, running), axis=1)
+
+
+def next_zero_index(mask):
+    """Index of the first False at or after each position (the row length if none)."""
+    n = mask.shape[1]
+    zeros = np.where(mask, n, np.arange(n))
+    return np.minimum.accumulate(zeros[:, ::-1], axis=1)[:, ::-1]
+
+
+def sparse_max_table(values):
+    """Sparse table for O(1) range-max queries: level k holds maxima of 2**k-long spans."""
+    levels = [values]
+    span = 1
+    while span * 2 <= values.shape[1]:
+        previous = levels[-1]
+        levels.append(np.maximum(previous[:, :-span], previous[:, span:]))
+        span *= 2
+    # Pad levels to the same width so they stack into one (levels, rows, days) array
+    width = values.shape[1]
+    return np.stack([np.pad(level, ((0, 0), (0, width - level.shape[1]))) for level in levels])
+
+
+def range_max(table, lo, hi):
+    """Max of each row over [lo[j], hi[j]] for every j; requires lo <= hi."""
+    length = hi - lo + 1
+    k = np.floor(np.log2(length)).astype(np.int64)
+    rows = np.arange(table.shape[1])[:, None]
+    return np.maximum(table[k, rows, lo], table[k, rows, hi - (1 << k) + 1])
+
+
+def window_streaks(runs, next_zero, run_table, lo, t):
+    """Longest run of non-zero days inside each window [lo, t].
+
+    A run that started before the window only counts from lo; it ends at the
+    first zero z at or after lo. Runs after z lie fully inside the window, so
+    their lengths are the range max of runs over [z, t].
+    """
+    z = next_zero[:, lo]
+    clipped_first = np.minimum(z, t + 1) - lo
+    inside = z <= t
+    z_safe = np.where(inside, z, t)
+    later = range_max(run_table, z_safe, np.broadcast_to(t, z.shape))
+    return np.where(inside, np.maximum(clipped_first, later), clipped_first)
+
+
+def rolling_iqr_thresholds(counts, w):
+    """Q3 + 1.5 * IQR of each trailing window, with np.quantile's linear interpolation.
+
+    The quartiles are read from exact order statistics of every window, so
+    the cost does not grow with w.
+    """
+    n_series, n_days = counts.shape
+    sizes = np.minimum(np.arange(n_days) + 1, w)
+    # Lower and upper ranks of Q1 and Q3 in each window, as np.quantile picks them
+    positions = np.outer([0.25, 0.75], sizes - 1)
+    lower = np.floor(positions).astype(np.int64)
+    upper = np.minimum(lower + 1, sizes - 1)
+    ranks = np.vstack([lower, upper])
+
+    statistics = np.empty((len(ranks), n_series, n_days), dtype=counts.dtype)
+    few_values = np.array([len(np.unique(row)) <= HISTOGRAM_MAX_VALUES for row in counts], dtype=bool)
+    if few_values.any():
+        statistics[:, few_values] = histogram_order_statistics(counts[few_values], w, ranks)
+    for row in np.flatnonzero(~few_values):
+        statistics[:, row] = sorted_window_order_statistics(counts[row], w, ranks)
+
+    a, b = statistics[:2].astype(np.float64), statistics[2:].astype(np.float64)
+    t = (positions - lower)[:, None, :]
+    diff = b - a
+    q1, q3 = np.where(t >= 0.5, b - diff * (1 - t), a + diff * t)
+    return q3 + 1.5 * (q3 - q1)
+
+
+def histogram_order_statistics(counts, w, ranks):
+    """Values at the given ranks (ranks x days) of each row's trailing windows.
+
+    The value at rank r is the smallest value v with more than r window days
+    at or below v, and those day counts come from one cumulative sum per
+    distinct value.
+    """
+    n_series, n_days = counts.shape
+    values = np.unique(counts)
+    lo = np.maximum(np.arange(n_days) - w + 1, 0)
+    index = np.zeros((len(ranks), n_series, n_days), dtype=np.int64)
+    # Every window day is at or below the largest value, so it never moves an index
+    for value in values[:-1]:
+        cumulative = np.concatenate([np.zeros((n_series, 1), dtype=np.int64), np.cumsum(counts <= value, axis=1)], axis=1)
+        at_or_below = cumulative[:, 1:] - cumulative[:, lo]
+        index += at_or_below <= ranks[:, None, :]
+    return values[index]
+
+
+def sorted_window_order_statistics(row, w, ranks):
+    """Values at the given ranks (ranks x days) of one series' trailing windows, from a sorted window."""
+    values = row.tolist()
+    window = []
+    statistics = []
+    for t, day_ranks in enumerate(ranks.T.tolist()):
+        if t >= w:
+            del window[bisect_left(window, values[t - w])]
+        insort(window, values[t])
+        statistics.append([window[rank] for rank in day_ranks])
+    return np.array(statistics, dtype=row.dtype).T
@@ -0,0 +1,270 @@
+"""Persistent daily counts with precomputed weekly, monthly and weekday rollups.
+
+Each hostel's daily counts are ingested once into a SQLite file. Every
+ingest applies its deltas to three cubes per hostel and metric:
+
+    week           Monday-start week id (same bins as analyze_counts)
+    month          months since 1970-01
+    month_weekday  month * 7 + weekday, so weekday totals can be summed per month
+
+Each cube bucket holds the bucket's total, its active (non-zero) days and
+its recorded days. A date-range query reads the buckets that lie fully
+inside the range, plus at most one partial bucket at each edge from the
+daily table. The cost is then set by the number of months and weeks, not
+the number of days.
+"""
+import os
+
+import numpy as np
+
+from dates import WEEKDAY_NAMES, parse_labels
+from function import ATTENDANCE_SECTIONS
+from sqlite_local import LocalConnections
+
+GRAINS = ("week", "month", "month_weekday")
+
+
+def week_of(day):
+    return (day + 3) // 7
+
+
+def week_bounds(week):
+    return week * 7 - 3, week * 7 + 3
+
+
+def month_of(day):
+    return int(np.datetime64(int(day), "D").astype("datetime64[M]").astype(np.int64))
+
+
+def month_bounds(month):
+    first = np.datetime64(int(month), "M")
+    return int(first.astype("datetime64[D]").astype(np.int64)), int((first + 1).astype("datetime64[D]").astype(np.int64)) - 1
+
+
+def bucket_keys(days):
+    """Cube bucket ids of each day (int64 day numbers) for every grain."""
+    months = days.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+    return {
+        "week": (days + 3) // 7,
+        "month": months,
+        "month_weekday": months * 7 + (days + 3) % 7,
+    }
+
+
+class RollupStore:
+    """Daily counts per hostel and metric plus their rollup cubes, in one SQLite file."""
+
+    def __init__(self, path):
+        self.path = path
+        self._connections = LocalConnections(path)
+        self._connections.create_schema(
+            "CREATE TABLE IF NOT EXISTS daily ("
+            "hostel TEXT NOT NULL, metric TEXT NOT NULL, day INTEGER NOT NULL, value INTEGER NOT NULL, "
+            "PRIMARY KEY (hostel, metric, day)) WITHOUT ROWID",
+            "CREATE TABLE IF NOT EXISTS rollups ("
+            "hostel TEXT NOT NULL, metric TEXT NOT NULL, grain TEXT NOT NULL, bucket INTEGER NOT NULL, "
+            "total INTEGER NOT NULL, active INTEGER NOT NULL, days INTEGER NOT NULL, "
+            "PRIMARY KEY (hostel, metric, grain, bucket)) WITHOUT ROWID",
+        )
+
+    def ingest(self, hostel, data):
+        """Stores the payload's daily counts for a hostel, replacing days already stored.
+
+        Only the differences from what was stored before are added to the
+        cubes, so re-sending overlapping history is safe.
+        """
+        series = data["data"]
+        days = parse_labels(series["labels"]).astype(np.int64)
+        sections = [section for section, spec in ATTENDANCE_SECTIONS.items() if spec[0] in series]
+        if not sections:
+            raise ValueError(f"Payload has none of {', '.join(spec[0] for spec in ATTENDANCE_SECTIONS.values())}")
+        if len(days) == 0:
+            raise ValueError("No dates to ingest")
+
+        # Collapse duplicate dates (last value wins, as a later upsert would)
+        order = np.argsort(days, kind="stable")
+        last = np.r_[days[order][1:] != days[order][:-1], True]
+        keep = order[last]
+        days = days[keep]
+        keys = bucket_keys(days)
+
+        columns = [np.asarray(series[ATTENDANCE_SECTIONS[section][0]]) for section in sections]
+        for values in columns:
+            if len(values) != len(order):
+                raise ValueError(f"Expected {len(order)} values per series, got {len(values)}")
+
+        with self._connections.connect() as conn:
+            # Take the write lock before reading old values, so overlapping ingests cannot both apply deltas to them
+            conn.execute("BEGIN IMMEDIATE")
+            for section, values in zip(sections, columns):
+                self._apply(conn, hostel, section, days, values[keep].astype(np.int64), keys)
+        return {"hostel": hostel, "days": len(days), "sections": sections,
+                "first_day": str(np.datetime64(int(days[0]), "D")), "last_day": str(np.datetime64(int(days[-1]), "D"))}
+
+    def _apply(self, conn, hostel, metric, days, values, keys):
+        old = dict(conn.execute(
+            "SELECT day, value FROM daily WHERE hostel = ? AND metric = ? AND day BETWEEN ? AND ?",
+            (hostel, metric, int(days[0]), int(days[-1])),
+        ).fetchall())
+        existed = np.array([day in old for day in days.tolist()], dtype=bool)
+        previous = np.array([old.get(day, 0) for day in days.tolist()], dtype=np.int64)
+
+        delta_total = values - previous
+        delta_active = (values > 0).astype(np.int64) - ((previous > 0) & existed)
+        delta_days = (~existed).astype(np.int64)
+
+        conn.executemany(
+            "INSERT OR REPLACE INTO daily (hostel, metric, day, value) VALUES (?, ?, ?, ?)",
+            [(hostel, metric, day, value) for day, value in zip(days.tolist(), values.tolist())],
+        )
+        for grain in GRAINS:
+            buckets, index = np.unique(keys[grain], return_inverse=True)
+            deltas = np.stack([np.bincount(index, weights=delta, minlength=len(buckets)) for delta in (delta_total, delta_active, delta_days)])
+            conn.executemany(
+                "INSERT INTO rollups (hostel, metric, grain, bucket, total, active, days) VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (hostel, metric, grain, bucket) DO UPDATE SET "
+                "total = total + excluded.total, active = active + excluded.active, days = days + excluded.days",
+                [(hostel, metric, grain, bucket, total, active, count)
+                 for bucket, (total, active, count) in zip(buckets.tolist(), deltas.T.astype(np.int64).tolist())],
+            )
+
+    def _buckets(self, conn, hostel, metric, grain, lo, hi):
+        return conn.execute(
+            "SELECT bucket, total, active, days FROM rollups "
+            "WHERE hostel = ? AND metric = ? AND grain = ? AND bucket BETWEEN ? AND ? AND days > 0",
+            (hostel, metric, grain, lo, hi),
+        ).fetchall()
+
+    def _edge_days(self, conn, hostel, metric, start, end, inner_start, inner_end):
+        """Daily rows in [start, end] outside the fully covered [inner_start, inner_end]."""
+        if inner_start > inner_end:
+            return conn.execute(
+                "SELECT day, value FROM daily WHERE hostel = ? AND metric = ? AND day BETWEEN ? AND ?",
+                (hostel, metric, start, end),
+            ).fetchall()
+        # Two range scans: an OR of ranges would not use the primary key
+        return (
+            self._edge_days(conn, hostel, metric, start, inner_start - 1, 1, 0)
+            + self._edge_days(conn, hostel, metric, inner_end + 1, end, 1, 0)
+        )
+
+    def day_range(self, hostel):
+        """First and last stored day of a hostel, from per-metric primary key lookups."""
+        conn = self._connections.connect()
+        bounds = [
+            conn.execute(
+                "SELECT MIN(day), MAX(day) FROM daily WHERE hostel = ? AND metric = ?", (hostel, metric)
+            ).fetchone()
+            for metric in ATTENDANCE_SECTIONS
+        ]
+        bounds = [bound for bound in bounds if bound[0] is not None]
+        if not bounds:
+            return None, None
+        return min(bound[0] for bound in bounds), max(bound[1] for bound in bounds)
+
+    def query(self, hostel, sections=None, start=None, end=None):
+        """Totals, averages, weekday distribution and monthly/weekly trends over [start, end].
+
+        `start` and `end` are date labels (inclusive); either may be omitted
+        to use the hostel's whole history. The statistics match what
+        analyze_counts reports for the same stored days, except streaks and
+        anomalies, which need the raw days.
+        """
+        start = None if start is None else int(parse_labels([start]).astype(np.int64)[0])
+        end = None if end is None else int(parse_labels([end]).astype(np.int64)[0])
+        if start is None or end is None:
+            first, last = self.day_range(hostel)
+            if first is None:
+                raise KeyError(hostel)
+            start = first if start is None else start
+            end = last if end is None else end
+        if start > end:
+            raise ValueError("start is after end")
+        sections = list(ATTENDANCE_SECTIONS) if sections is None else sections
+        unknown = [section for section in sections if section not in ATTENDANCE_SECTIONS]
+        if unknown:
+            raise ValueError(f"Unknown sections: {', '.join(unknown)}")
+
+        # Buckets that lie entirely inside [start, end]
+        first_month, last_month = month_of(start), month_of(end)
+        if month_bounds(first_month)[0] < start:
+            first_month += 1
+        if month_bounds(last_month)[1] > end:
+            last_month -= 1
+        month_span = (month_bounds(first_month)[0], month_bounds(last_month)[1]) if first_month <= last_month else (1, 0)
+
+        first_week, last_week = week_of(start), week_of(end)
+        if week_bounds(first_week)[0] < start:
+            first_week += 1
+        if week_bounds(last_week)[1] > end:
+            last_week -= 1
+        week_span = (week_bounds(first_week)[0], week_bounds(last_week)[1]) if first_week <= last_week else (1, 0)
+
+        conn = self._connections.connect()
+        results = {}
+        for section in sections:
+            months = {}
+            weekdays = {}
+            for bucket, total, active, count in self._buckets(conn, hostel, section, "month", first_month, last_month):
+                months[bucket] = [total, active, count]
+            for weekday, total, count in conn.execute(
+                "SELECT ((bucket % 7) + 7) % 7 AS weekday, SUM(total), SUM(days) FROM rollups "
+                "WHERE hostel = ? AND metric = ? AND grain = 'month_weekday' AND bucket BETWEEN ? AND ? "
+                "GROUP BY weekday",
+                (hostel, section, first_month * 7, last_month * 7 + 6),
+            ):
+                weekdays[weekday] = [total, count]
+            for day, value in self._edge_days(conn, hostel, section, start, end, *month_span):
+                month_totals = months.setdefault(month_of(day), [0, 0, 0])
+                month_totals[0] += value
+                month_totals[1] += value > 0
+                month_totals[2] += 1
+                weekday_totals = weekdays.setdefault((day + 3) % 7, [0, 0])
+                weekday_totals[0] += value
+                weekday_totals[1] += 1
+
+            weeks = {bucket: total for bucket, total, _, _ in self._buckets(conn, hostel, section, "week", first_week, last_week)}
+            for day, value in self._edge_days(conn, hostel, section, start, end, *week_span):
+                weeks[week_of(day)] = weeks.get(week_of(day), 0) + value
+
+            if not months:
+                results[section] = {"error": "No stored days in range"}
+                continue
+            results[section] = rollup_statistics(months, weekdays, weeks)
+        return results
+
+
+def rollup_statistics(months, weekdays, weeks):
+    """Formats combined buckets in the basic_statistics/temporal_patterns shape of analyze_counts."""
+    total = sum(bucket[0] for bucket in months.values())
+    active = sum(bucket[1] for bucket in months.values())
+    recorded = sum(bucket[2] for bucket in months.values())
+    first_month, last_month = min(months), max(months)
+    first_week, last_week = min(weeks), max(weeks)
+    present = sorted((d for d, (_, count) in weekdays.items() if count), key=lambda d: WEEKDAY_NAMES[d])
+    labels = np.datetime_as_string(np.arange(first_month, last_month + 1).astype("datetime64[M]")).tolist()
+    week_ids = np.arange(first_week, last_week + 1)
+    week_labels = np.datetime_as_string((week_ids * 7 - 3).astype("datetime64[D]"))
+    week_totals = np.zeros(len(week_ids), dtype=np.int64)
+    week_totals[np.fromiter(weeks.keys(), dtype=np.int64, count=len(weeks)) - first_week] = list(weeks.values())
+    return {
+        "basic_statistics": {
+            "total": int(total),
+            "active_days": int(active),
+            "recorded_days": int(recorded),
+            "frequency": {
+                # np.float64 rounds like analyze_counts, which differs from round() on floats
+                "daily_avg": round(np.float64(total / recorded), 2),
+                "weekly_avg": round(np.float64(total / (last_week - first_week + 1)), 2)
+            }
+        },
+        "temporal_patterns": {
+            "daily_distribution": {str(WEEKDAY_NAMES[d]): int(weekdays[d][0]) for d in present},
+            "monthly_trend": {label: int(months.get(first_month + i, [0])[0]) for i, label in enumerate(labels)},
+            "weekly_trend": dict(zip(week_labels.tolist(), week_totals.tolist()))
+        }
+    }
+
+
+def store_from_env():
+    return RollupStore(os.environ.get("ANALYSIS_ROLLUP_PATH", "rollups.db"))
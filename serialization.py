@@ -0,0 +1,150 @@
+"""Response encoding: fast JSON, an optional compact layout and compression.
+
+dumps() uses orjson (a requirement; NumPy arrays and scalars are encoded
+natively) and falls back to the standard library if it is missing. Both
+write the same JSON: keys sorted, as jsonify sorted them, and NaN or
+infinite floats as null, which orjson cannot write any other way.
+
+The "compact" layout replaces label-keyed mappings (monthly_trend,
+weekly_trend, by_month) with parallel arrays,
+
+    {"2025-01": 265, "2025-02": 133}  ->  {"labels": ["2025-01", "2025-02"], "values": [265, 133]}
+
+and lists of records (most_unexpected_urgent) with one array per field.
+Bodies of at least MIN_COMPRESS_BYTES are compressed with zstd (when the
+zstandard package is installed) or gzip, as the client's Accept-Encoding
+allows.
+"""
+import datetime
+import gzip
+import json
+import math
+import os
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+LAYOUTS = ["nested", "compact"]
+DEFAULT_LAYOUT = os.environ.get("ANALYSIS_RESPONSE_LAYOUT", "nested")
+COMPACT_MAPPINGS = {"monthly_trend", "weekly_trend", "by_month"}
+MIN_COMPRESS_BYTES = int(os.environ.get("ANALYSIS_COMPRESS_MIN_BYTES", "1024"))
+GZIP_LEVEL = 5
+ZSTD_LEVEL = 3
+# Preferred first
+ENCODINGS = (["zstd"] if zstandard is not None else []) + ["gzip"]
+
+
+def json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(result):
+    """JSON bytes for an analysis result."""
+    if orjson is None:
+        return stdlib_dumps(result)
+    return orjson.dumps(
+        result, default=json_default,
+        option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS | orjson.OPT_SORT_KEYS,
+    )
+
+
+def stdlib_dumps(result):
+    return json.dumps(finite_or_null(result), default=json_default, separators=(",", ":"), sort_keys=True).encode("utf-8")
+
+
+def finite_or_null(value):
+    """The value with NaN and infinite floats (NumPy ones included) replaced by None, as orjson writes them."""
+    if isinstance(value, (float, np.floating)):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {key: finite_or_null(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [finite_or_null(item) for item in value]
+    if isinstance(value, np.ndarray):
+        return finite_or_null(value.tolist())
+    return value
+
+
+def compact(value):
+    """The compact layout of a result; other values are returned unchanged."""
+    if isinstance(value, dict):
+        compacted = {}
+        for key, item in value.items():
+            if isinstance(item, dict):
+                compacted[key] = compact_mapping(item) if key in COMPACT_MAPPINGS else compact(item)
+            elif isinstance(item, list):
+                compacted[key] = compact(item)
+            else:
+                compacted[key] = item
+        return compacted
+    if isinstance(value, list) and value:
+        if isinstance(value[0], dict):
+            fields = list(value[0])
+            if all(isinstance(row, dict) and list(row) == fields for row in value):
+                return {field: [row[field] for row in value] for field in fields}
+        elif not isinstance(value[0], list):
+            # Lists of dates or values, left as they are
+            return value
+        return [compact(item) for item in value]
+    return value
+
+
+def compact_mapping(mapping):
+    labels = list(mapping)
+    values = list(mapping.values())
+    if values and isinstance(values[0], dict):
+        return {"labels": labels, **{field: [value[field] for value in values] for field in values[0]}}
+    return {"labels": labels, "values": values}
+
+
+def negotiate(accept_encoding):
+    """The preferred encoding the client accepts, or None for identity."""
+    accepted = {}
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    for encoding in ENCODINGS:
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+
+def compress(body, encoding):
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    return body
+
+
+def encode(result, layout=None, accept_encoding=None):
+    """Returns (body bytes, Content-Encoding or None) for a result."""
+    layout = layout or DEFAULT_LAYOUT
+    if layout not in LAYOUTS:
+        raise ValueError(f"Unknown layout: {layout}")
+    # Newline-terminated like jsonify
+    body = dumps(compact(result) if layout == "compact" else result) + b"\n"
+    encoding = negotiate(accept_encoding) if len(body) >= MIN_COMPRESS_BYTES else None
+    return compress(body, encoding), encoding
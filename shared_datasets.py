@@ -0,0 +1,177 @@
+"""Read-only datasets memory-mapped from disk and shared by every worker process.
+
+Registering a payload writes it once as binary files under
+ANALYSIS_SHARED_DIR (default: shared_datasets/), in a directory named by
+the content hash of the files:
+
+    counts.atnd        the count series in the packed columnar format
+    leave_days.npy     int64 epoch days of plannedUnplannedLeavesTrends, sorted
+    leave_values.npy   the (5 x days) float64 matrix of leave_trends_numpy.decode_rows
+
+Any worker can then open the dataset by id. The files are mapped read-only
+and the analyses run on views over the mapping, so every worker on the host
+shares one copy of the history in the page cache instead of decoding its own.
+"""
+import hashlib
+import io
+import mmap
+import os
+import re
+import shutil
+import tempfile
+import threading
+
+import numpy as np
+
+from columnar import pack, packed_arrays
+from dates import calendar_for
+from function import ATTENDANCE_SECTIONS, analyze_sections
+from leave_trends_numpy import decode_rows, leave_trends_matrix
+
+SHARED_DIR = os.environ.get("ANALYSIS_SHARED_DIR", "shared_datasets")
+COUNTS_FILE = "counts.atnd"
+LEAVE_DAYS_FILE = "leave_days.npy"
+LEAVE_VALUES_FILE = "leave_values.npy"
+DATASET_ID = re.compile(r"[0-9a-f]{32}")
+
+
+class MappedDataset:
+    """One registered dataset, mapped read-only into this process."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, COUNTS_FILE), "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        names, days, self.counts = packed_arrays(self._mmap)
+        self.rows = {name: i for i, name in enumerate(names)}
+        self.calendar = calendar_for(days.astype("datetime64[D]")) if len(days) else None
+
+        leave_days = os.path.join(path, LEAVE_DAYS_FILE)
+        if os.path.exists(leave_days):
+            self.leave_days = np.load(leave_days, mmap_mode="r").view("datetime64[D]")
+            self.leave_values = np.load(os.path.join(path, LEAVE_VALUES_FILE), mmap_mode="r")
+        else:
+            self.leave_days = self.leave_values = None
+
+    @property
+    def sections(self):
+        sections = [section for section, spec in ATTENDANCE_SECTIONS.items() if spec[0] in self.rows]
+        if self.leave_values is not None:
+            sections.append("leave_trends")
+        return sections
+
+    def __len__(self):
+        return self.counts.shape[1]
+
+    def analysis(self, sections=None, detector=None):
+        """Same result shape as function.analyze, computed on the mapped arrays."""
+        sections = self.sections if sections is None else sections
+        results = {}
+        attendance = [section for section in sections if section in ATTENDANCE_SECTIONS]
+        available = [section for section in attendance if ATTENDANCE_SECTIONS[section][0] in self.rows]
+        for section in attendance:
+            if section not in available:
+                results[section] = {"error": f"Dataset has no '{ATTENDANCE_SECTIONS[section][0]}' series"}
+
+        if available:
+            try:
+                if self.calendar is None:
+                    raise ValueError("attempt to get argmax of an empty sequence")
+                rows = [self.rows[ATTENDANCE_SECTIONS[section][0]] for section in available]
+                # A run of consecutive rows is a view; only other selections copy
+                if rows == list(range(rows[0], rows[0] + len(rows))):
+                    counts = self.counts[rows[0]:rows[0] + len(rows)]
+                else:
+                    counts = self.counts[rows]
+                results.update(analyze_sections(self.calendar, counts, available, detector))
+            except Exception as e:
+                results.update({section: {"error": str(e)} for section in available})
+
+        if "leave_trends" in sections:
+            try:
+                if self.leave_values is None:
+                    raise ValueError("Dataset has no 'plannedUnplannedLeavesTrends' rows")
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    results["leave_trends"] = leave_trends_matrix(self.leave_days, self.leave_values, detector)
+            except Exception as e:
+                results["leave_trends"] = {"error": str(e)}
+
+        return {section: results[section] for section in sections if section in results}
+
+
+class SharedDatasets:
+    """Registry of mapped datasets in a directory shared by all workers on the host."""
+
+    def __init__(self, directory=SHARED_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._mapped = {}
+        self._lock = threading.Lock()
+
+    def register(self, data):
+        """Writes a payload's series to disk and returns its dataset id (the same for the same data)."""
+        series = data["data"]
+        present = {spec[0]: series[spec[0]] for spec in ATTENDANCE_SECTIONS.values() if spec[0] in series}
+        rows = series.get("plannedUnplannedLeavesTrends")
+        if not present and not rows:
+            raise ValueError("Payload has no count series or plannedUnplannedLeavesTrends rows")
+        labels = series["labels"] if present else []
+        for key, values in present.items():
+            if len(values) != len(labels):
+                raise ValueError(f"Expected {len(labels)} values in '{key}', got {len(values)}")
+
+        files = {COUNTS_FILE: pack(labels, present)}
+        if rows:
+            days, values = decode_rows(rows)
+            files[LEAVE_DAYS_FILE] = npy_bytes(days.astype("<i8"))
+            files[LEAVE_VALUES_FILE] = npy_bytes(values)
+
+        digest = hashlib.sha256()
+        for name in sorted(files):
+            digest.update(name.encode() + b"\0" + files[name])
+        dataset_id = digest.hexdigest()[:32]
+
+        target = os.path.join(self.directory, dataset_id)
+        if not os.path.exists(target):
+            staging = tempfile.mkdtemp(prefix=".staging-", dir=self.directory)
+            for name, content in files.items():
+                with open(os.path.join(staging, name), "wb") as f:
+                    f.write(content)
+            try:
+                os.rename(staging, target)
+            except OSError:
+                # Another worker registered the same data first
+                shutil.rmtree(staging, ignore_errors=True)
+        return dataset_id
+
+    def get(self, dataset_id):
+        """The mapped dataset, or None if it is not registered."""
+        if not DATASET_ID.fullmatch(dataset_id):
+            return None
+        path = os.path.join(self.directory, dataset_id)
+        with self._lock:
+            dataset = self._mapped.get(dataset_id)
+            if not os.path.isdir(path):
+                # Deleted by another worker; our mapping stays valid until released
+                self._mapped.pop(dataset_id, None)
+                return None
+            if dataset is None:
+                dataset = self._mapped[dataset_id] = MappedDataset(path)
+            return dataset
+
+    def delete(self, dataset_id):
+        if not DATASET_ID.fullmatch(dataset_id):
+            return False
+        path = os.path.join(self.directory, dataset_id)
+        with self._lock:
+            self._mapped.pop(dataset_id, None)
+            if not os.path.isdir(path):
+                return False
+            shutil.rmtree(path, ignore_errors=True)
+        return True
+
+
+def npy_bytes(array):
+    buffer = io.BytesIO()
+    np.save(buffer, np.ascontiguousarray(array))
+    return buffer.getvalue()
@@ -0,0 +1,42 @@
+import os
+import sqlite3
+import threading
+
+
+class LocalConnections:
+    """Per-thread connections to one SQLite file in WAL mode, shared by every worker that opens it.
+
+    Each thread opens its own connection on first use, and a forked process
+    opens new ones instead of sharing its parent's. Stores may be built in a
+    pre-fork master, so create_schema runs on a connection it closes again.
+    """
+
+    def __init__(self, path, timeout=5, isolation_level=""):
+        self.path = path
+        self.timeout = timeout
+        self.isolation_level = isolation_level
+        self._local = threading.local()
+
+    def _open(self):
+        conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=self.isolation_level)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def connect(self):
+        """This thread's connection in this process."""
+        local = self._local
+        if getattr(local, "pid", None) != os.getpid():
+            local.conn = None
+            local.pid = os.getpid()
+        if local.conn is None:
+            local.conn = self._open()
+        return local.conn
+
+    def create_schema(self, *statements):
+        conn = self._open()
+        try:
+            with conn:
+                for statement in statements:
+                    conn.execute(statement)
+        finally:
+            conn.close()
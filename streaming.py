@@ -0,0 +1,131 @@
+"""Incremental NDJSON analysis.
+
+Each input line is either a full payload for one tenant,
+    {"hostel_id": "h1", "data": {...data.json "data" object...}}
+or a single day for one tenant,
+    {"hostel_id": "h1", "date": "2025-01-31", "late_checked_in": 0, "on_leave": 12, ...}
+
+Full payloads are analyzed and emitted as soon as their line is read. Day
+records are folded into a per-tenant AttendanceDataset and emitted when the
+input ends, or as soon as the tenant changes when the input is grouped by
+tenant, so only one tenant's aggregates are held at a time.
+
+Usage: python streaming.py [input.ndjson|-] [--sections a,b] [--grouped]
+"""
+import argparse
+import json
+import sys
+
+from function import ATTENDANCE_SECTIONS, ALL_SECTIONS, LEAVE_TREND_COLUMNS, analyze, leave_trends
+from incremental import AttendanceDataset
+from serialization import dumps
+from summary import with_summaries
+
+
+class TenantAccumulator:
+    """Day-by-day aggregates for one tenant."""
+
+    def __init__(self):
+        self.dataset = None
+        self.leave_rows = []
+
+    def add(self, record):
+        date = record["date"]
+        series_keys = [spec[0] for spec in ATTENDANCE_SECTIONS.values() if spec[0] in record]
+        if series_keys:
+            if self.dataset is None:
+                self.dataset = AttendanceDataset(
+                    [section for section, spec in ATTENDANCE_SECTIONS.items() if spec[0] in record]
+                )
+            day = {key: [record[key]] for key in series_keys}
+            day["labels"] = [date]
+            self.dataset.append(day)
+        if "urgent_count" in record:
+            row = {column: record[column] for column in LEAVE_TREND_COLUMNS}
+            row["date"] = date
+            self.leave_rows.append(row)
+
+    @property
+    def days(self):
+        return len(self.dataset) if self.dataset is not None else len(self.leave_rows)
+
+    def results(self, sections=None):
+        sections = ALL_SECTIONS if sections is None else sections
+        results = {}
+        if self.dataset is not None:
+            tracked = [section for section in sections if section in self.dataset.sections]
+            if tracked:
+                results.update(self.dataset.analysis(tracked))
+        if self.leave_rows and "leave_trends" in sections:
+            try:
+                results["leave_trends"] = leave_trends({"data": {"plannedUnplannedLeavesTrends": self.leave_rows}})
+            except Exception as e:
+                results["leave_trends"] = {"error": str(e)}
+        return with_summaries(results)
+
+
+def stream_analysis(lines, sections=None, grouped=False):
+    """Yields one result dict per payload record and per day-record tenant."""
+    tenants = {}
+
+    def flush(tenant_id):
+        accumulator = tenants.pop(tenant_id)
+        try:
+            return {"hostel_id": tenant_id, "days": accumulator.days, "results": accumulator.results(sections)}
+        except Exception as e:
+            return {"hostel_id": tenant_id, "error": str(e)}
+
+    current = None
+    for line_number, line in enumerate(lines, start=1):
+        if isinstance(line, bytes):
+            line = line.decode("utf-8")
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+            tenant_id = record.get("hostel_id")
+
+            if "data" in record:
+                yield {"hostel_id": tenant_id, "line": line_number, "results": with_summaries(analyze(record, sections))}
+                continue
+
+            if grouped and current is not None and tenant_id != current and current in tenants:
+                yield flush(current)
+            current = tenant_id
+            tenants.setdefault(tenant_id, TenantAccumulator()).add(record)
+        except Exception as e:
+            yield {"line": line_number, "error": str(e)}
+
+    for tenant_id in list(tenants):
+        yield flush(tenant_id)
+
+
+def encode_ndjson(results):
+    for result in results:
+        yield dumps(result) + b"\n"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyze NDJSON attendance records incrementally.")
+    parser.add_argument("input", nargs="?", default="-", help="NDJSON file, or - for stdin")
+    parser.add_argument("--sections", help="Comma-separated subset of " + ", ".join(ALL_SECTIONS))
+    parser.add_argument("--grouped", action="store_true", help="Input is grouped by hostel_id; emit each tenant when it ends")
+    args = parser.parse_args(argv)
+
+    sections = [section.strip() for section in args.sections.split(",")] if args.sections else None
+    unknown = [section for section in sections or [] if section not in ALL_SECTIONS]
+    if unknown:
+        parser.error(f"Unknown sections: {', '.join(unknown)}")
+
+    source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    try:
+        for chunk in encode_ndjson(stream_analysis(source, sections, args.grouped)):
+            sys.stdout.buffer.write(chunk)
+            sys.stdout.flush()
+    finally:
+        if source is not sys.stdin:
+            source.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,15 @@
 import json
+import os
 
+from metrics import timed
+from summary_engine import default_engine
+
+# "rules" renders summary_rules.json through summary_engine; "python" runs the generators below
+SUMMARY_ENGINES = ["rules", "python"]
+SUMMARY_ENGINE = os.environ.get("SUMMARY_ENGINE", "rules")
+
+
+@timed("summary.on_leave")
 def generate_leave_summary(data):
     anomalies = data["anomalies"]
     statistics = data["basic_statistics"]
@@ -9,7 +19,7 @@ def generate_leave_summary(data):
     summary = []
 
     # Weekend Extension Analysis
-    if patterns["daily_distribution"]["Friday"] > 70 and patterns["daily_distribution"]["Saturday"] > 75:
+    if patterns["daily_distribution"].get("Friday", 0) > 70 and patterns["daily_distribution"].get("Saturday", 0) > 75:
         summary.append("Students frequently take leave on Fridays and Saturdays, likely to extend their weekends for travel or relaxation.")
 
     # Monthly Leave Trends
@@ -19,7 +29,7 @@ def generate_leave_summary(data):
         summary.append(f"Significant leave trends were observed in {months}, possibly due to holidays, academic breaks, or personal travel.")
 
     # Anomaly Detection & Patterns
-    if max(anomalies["values"]) > anomalies["threshold"]:
+    if anomalies["values"] and max(anomalies["values"]) > anomalies["threshold"]:
         anomaly_start = anomalies["anomalous_dates"][0]
         anomaly_end = anomalies["anomalous_dates"][-1]
         summary.append(f"An unusual spike in leaves was recorded from {anomaly_start} to {anomaly_end}, suggesting events like exams, festivals, or urgent travel needs.")
@@ -37,6 +47,7 @@ def generate_leave_summary(data):
     return {"Summary": "\n".join(summary)}
 
 
+@timed("summary.late_checkins")
 def generate_late_checkin_summary(data):
     """Generates a textual summary for late check-ins."""
     if "error" in data:
@@ -79,6 +90,7 @@ def generate_late_checkin_summary(data):
     return {"Summary": "\n".join(summary)}
 
 
+@timed("summary.non_checked_in")
 def generate_non_checked_in_summary(data):
     """Generates a summary of students who did not check out of the hostel."""
     if "error" in data:
@@ -98,7 +110,7 @@ def generate_non_checked_in_summary(data):
     summary.append(f"The highest number of non-checked-in students was recorded on {events['most_severe_day']}.")
 
     # Anomaly Detection
-    if max(anomalies["values"]) > anomalies["threshold"]:
+    if anomalies["values"] and max(anomalies["values"]) > anomalies["threshold"]:
         anomaly_dates = ", ".join(anomalies["anomalous_dates"])
         summary.append(f"Unusual non-check-in patterns were observed on {anomaly_dates}, indicating possible exams, events, or restrictions.")
 
@@ -119,6 +131,43 @@ def generate_non_checked_in_summary(data):
 
     return {"Summary": "\n".join(summary)}
 
+@timed("summary.no_record")
+def generate_no_record_summary(data):
+    """Generates a summary of students with no attendance record."""
+    if "error" in data:
+        return data["error"]
+
+    statistics = data["basic_statistics"]
+    events = data["significant_events"]
+    patterns = data["temporal_patterns"]
+
+    if statistics["total_no_record"] == 0:
+        return {"Summary": "Every student had an attendance record on every day."}
+
+    summary = []
+
+    # Overall Missing Record Stats
+    summary.append(f"A total of {statistics['total_no_record']} missing attendance records were found across {statistics['days_with_no_record']} days.")
+
+    # Most Severe Day
+    summary.append(f"The most missing records were on {events['most_severe_day']}, which may point to a device or data-entry issue.")
+
+    # Streaks
+    if statistics["max_consecutive_days"] > 7:
+        summary.append(f"Records were missing for up to {statistics['max_consecutive_days']} consecutive days, suggesting a sustained gap in attendance tracking.")
+
+    # Monthly Trends
+    high_months = {month: count for month, count in patterns["monthly_trend"].items() if count > 0}
+    if high_months:
+        months = ", ".join(high_months.keys())
+        summary.append(f"Missing records occurred in {months}.")
+
+    # Recent Activity Indicator
+    summary.append(f"The most recent missing record was on {events['recent_occurrence']}.")
+
+    return {"Summary": "\n".join(summary)}
+
+@timed("summary.leave_trends")
 def generate_leave_trend_summary(data):
     """Generates a summary of planned and urgent leave trends."""
     if "error" in data:
@@ -165,3 +214,45 @@ def generate_leave_trend_summary(data):
 
     return {"Summary": "\n".join(summary)}
 
+
+
+SUMMARY_GENERATORS = {
+    "late_checkins": generate_late_checkin_summary,
+    "on_leave": generate_leave_summary,
+    "non_checked_in": generate_non_checked_in_summary,
+    "no_record": generate_no_record_summary,
+    "leave_trends": generate_leave_trend_summary,
+}
+
+
+def summarize(section, analysis, engine=None):
+    """Summary of one section's analysis with the configured engine."""
+    engine = engine or SUMMARY_ENGINE
+    if engine not in SUMMARY_ENGINES:
+        raise ValueError(f"Unknown summary engine: {engine}")
+    if engine == "python":
+        return SUMMARY_GENERATORS[section](analysis)
+    return default_engine().summarize(section, analysis)
+
+
+def generate_summaries(results):
+    """Generates the summary for every analysis section in a combined result."""
+    summaries = {}
+    for section, analysis in results.items():
+        if "error" in analysis:
+            summaries[section] = {"error": analysis["error"]}
+            continue
+        try:
+            summaries[section] = summarize(section, analysis)
+        except Exception as e:
+            summaries[section] = {"error": str(e)}
+    return summaries
+
+
+def with_summaries(results):
+    """Pairs every section's analysis with its summary."""
+    summaries = generate_summaries(results)
+    return {
+        section: {"analysis": results[section], "summary": summaries[section]}
+        for section in results
+    }
@@ -0,0 +1,182 @@
+"""Rule-driven summary generation.
+
+Summary sentences and their thresholds live in summary_rules.json (or the
+file named by SUMMARY_RULES_PATH) instead of in code. Each section has a
+list of rules and, optionally, an "empty" rule that replaces the whole
+summary. A rule produces one sentence when all of its conditions hold:
+
+    when     [{"path", "op", "value" | "ref", "default"?, "reduce"?}]
+             compares the value at `path` (reduced with "max" etc. if set;
+             an empty list fails) with a constant or with the value at `ref`
+    collect  {name: {"path", "field"?, "op"?, "value"?, "take"?, "required"?}}
+             joins with ", " the keys of a dict whose value (or whose
+             `field`) passes the comparison; with `take`, the container is
+             a list of dicts and each passing item's `take` is joined.
+             Without a comparison every key or item is joined. The rule is
+             skipped when nothing is collected, unless "required" is false
+    fields   {name: path}, plain values for the template
+    text     a str.format-style template over the collected names and fields
+             (format specs are allowed, nested "{}" fields inside them are not)
+
+Paths are dotted keys into the analysis result; integer segments index
+lists ("anomalies.anomalous_dates.-1"). Each section's rules are compiled
+into the source of one Python function with the thresholds inlined and the
+templates turned into f-strings, so rendering costs no more than a
+hand-written generator.
+"""
+import json
+import os
+import string
+import threading
+
+from metrics import stage
+
+RULES_PATH = os.environ.get("SUMMARY_RULES_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "summary_rules.json"))
+
+OPERATORS = (">", ">=", "<", "<=", "==", "!=")
+REDUCERS = ("max", "min", "sum", "len")
+
+
+def path_expression(path, root="data", default=None, has_default=False):
+    """Python expression reading a dotted path, with dict.get() for a defaulted last key."""
+    keys = [int(key) if key.lstrip("-").isdigit() else key for key in path.split(".")]
+    expression = root + "".join(f"[{key!r}]" for key in keys[:-1])
+    if has_default:
+        return f"{expression}.get({keys[-1]!r}, {default!r})"
+    return f"{expression}[{keys[-1]!r}]"
+
+
+def check_operator(op):
+    if op not in OPERATORS:
+        raise ValueError(f"Unknown operator {op!r}; expected one of {', '.join(OPERATORS)}")
+    return op
+
+
+def condition_source(spec, name):
+    """(setup lines, boolean expression) for one "when" condition."""
+    value = path_expression(spec["path"], default=spec.get("default"), has_default="default" in spec)
+    other = path_expression(spec["ref"]) if "ref" in spec else repr(spec["value"])
+    op = check_operator(spec["op"])
+    if "reduce" in spec:
+        if spec["reduce"] not in REDUCERS:
+            raise ValueError(f"Unknown reduce {spec['reduce']!r}; expected one of {', '.join(REDUCERS)}")
+        return [f"{name} = {value}"], f"{name} and {spec['reduce']}({name}) {op} {other}"
+    return [], f"{value} {op} {other}"
+
+
+def collect_source(spec):
+    """Expression joining the collected keys or items with ", "."""
+    container = path_expression(spec["path"])
+    field = f"[{spec['field']!r}]" if "field" in spec else ""
+    test = f" if _value{field} {check_operator(spec['op'])} {spec['value']!r}" if "op" in spec else ""
+    if "take" in spec:
+        return f'", ".join([_value[{spec["take"]!r}] for _value in {container}{test}])'
+    if not test:
+        return f'", ".join({container})'
+    return f'", ".join([_key for _key, _value in {container}.items(){test}])'
+
+
+def fstring(template, names):
+    """f-string source for a str.format template whose fields are renamed to local variables."""
+    parsed = list(string.Formatter().parse(template))
+    if all(field is None for _, field, _, _ in parsed):
+        return repr(template)
+    parts = []
+    for literal, field, spec, conversion in parsed:
+        parts.append(literal.replace("{", "{{").replace("}", "}}"))
+        if field is not None:
+            if field not in names:
+                raise ValueError(f"Template field {field!r} is not collected or defined in {template!r}")
+            # A nested field in the spec would become an arbitrary expression in the f-string
+            if "{" in spec or "}" in spec:
+                raise ValueError(f"Template field {field!r} has a nested format spec in {template!r}")
+            parts.append("{" + names[field] + (f"!{conversion}" if conversion else "") + (f":{spec}" if spec else "") + "}")
+    return "f" + repr("".join(parts))
+
+
+def section_source(section, spec):
+    """Source of a summarize(data) function implementing one section's rules."""
+    # The name becomes part of the generated def, so anything else could inject code
+    if not isinstance(section, str) or not section.isidentifier():
+        raise ValueError(f"Section name {section!r} is not a valid identifier")
+    lines = [f"def summarize_{section}(data):"]
+    counter = iter(range(1 << 30))
+
+    empty = spec.get("empty")
+    if empty:
+        setup, tests = [], []
+        for condition in empty["when"]:
+            lines_, test = condition_source(condition, f"_e{next(counter)}")
+            setup += lines_
+            tests.append(test)
+        lines += [f"    {line}" for line in setup]
+        lines.append(f"    if {' and '.join(tests)}:")
+        lines.append(f"        return {{{empty.get('key', 'Summary')!r}: {empty['text']!r}}}")
+
+    lines.append("    sentences = []")
+    for rule in spec["rules"]:
+        indent = "    "
+        names = {}
+        setup, tests = [], []
+        for condition in rule.get("when", []):
+            lines_, test = condition_source(condition, f"_w{next(counter)}")
+            setup += lines_
+            tests.append(test)
+        lines += [indent + line for line in setup]
+        if tests:
+            lines.append(f"{indent}if {' and '.join(tests)}:")
+            indent += "    "
+        for name, collect in rule.get("collect", {}).items():
+            local = names[name] = f"_c{next(counter)}"
+            lines.append(f"{indent}{local} = {collect_source(collect)}")
+            if collect.get("required", True):
+                lines.append(f"{indent}if {local}:")
+                indent += "    "
+        for name, path in rule.get("fields", {}).items():
+            local = names[name] = f"_f{next(counter)}"
+            lines.append(f"{indent}{local} = {path_expression(path)}")
+        lines.append(f"{indent}sentences.append({fstring(rule['text'], names)})")
+    lines.append('    return {"Summary": "\\n".join(sentences)}')
+    return "\n".join(lines) + "\n"
+
+
+def compile_section(section, spec):
+    source = section_source(section, spec)
+    namespace = {}
+    exec(compile(source, f"<summary rules: {section}>", "exec"), namespace)
+    function = namespace[f"summarize_{section}"]
+    function.source = source
+    return function
+
+
+class SummaryEngine:
+    """Compiled summary rules for every section."""
+
+    def __init__(self, rules):
+        self.rules = rules
+        self.sections = {section: compile_section(section, spec) for section, spec in rules.items()}
+
+    @classmethod
+    def from_file(cls, path=RULES_PATH):
+        with open(path) as f:
+            return cls(json.load(f))
+
+    def summarize(self, section, analysis):
+        """Summary of one analysis result, in the shape the generate_*_summary functions return."""
+        if "error" in analysis:
+            return analysis["error"]
+        with stage(f"summary.{section}"):
+            return self.sections[section](analysis)
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def default_engine():
+    """The engine for RULES_PATH, compiled on first use."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = SummaryEngine.from_file()
+        return _engine
@@ -0,0 +1,81 @@
+"""Requests driven through AnalysisASGI, as an ASGI server would send them."""
+import asyncio
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app import app as flask_app
+from asgi import AnalysisASGI, call_wsgi, wsgi_environ
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def asgi_request(asgi_app, method, path, body=b"", query=b""):
+    """Sends one request in two body chunks; returns (status, body, messages sent)."""
+    incoming = [
+        {"type": "http.request", "body": body[:len(body) // 2], "more_body": True},
+        {"type": "http.request", "body": body[len(body) // 2:], "more_body": False},
+    ]
+    sent = []
+
+    async def receive():
+        return incoming.pop(0) if incoming else {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http", "method": method, "path": path, "query_string": query,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+    }
+    asyncio.run(asgi_app(scope, receive, send))
+    status = next(message["status"] for message in sent if message["type"] == "http.response.start")
+    return status, b"".join(message.get("body", b"") for message in sent if message["type"] == "http.response.body"), sent
+
+
+def ndjson_payloads(payload, count=3):
+    data = json.loads(payload)["data"]
+    return b"".join(json.dumps({"hostel_id": f"h{i}", "data": data}).encode() + b"\n" for i in range(count))
+
+
+@pytest.fixture
+def payload():
+    with open(os.path.join(ROOT, "data.json"), "rb") as f:
+        return f.read()
+
+
+@pytest.mark.parametrize("executor", ["thread", "process"])
+def test_stream_completes(payload, executor):
+    ndjson = ndjson_payloads(payload)
+    asgi_app = AnalysisASGI(flask_app, workers=1, warmup=False, executor=executor)
+    try:
+        status, body, sent = asgi_request(asgi_app, "POST", "/stream", ndjson)
+    finally:
+        for process in asgi_app.processes:
+            process.stop()
+    assert status == 200
+    # The body ends normally instead of the connection being aborted
+    assert sent[-1]["type"] == "http.response.body" and not sent[-1].get("more_body")
+    lines = [json.loads(line) for line in body.splitlines() if line]
+    assert [line["hostel_id"] for line in lines] == ["h0", "h1", "h2"]
+    assert not any("error" in line for line in lines)
+
+
+def test_analyze(payload):
+    status, body, _ = asgi_request(AnalysisASGI(flask_app, workers=1, warmup=False), "POST", "/analyze", payload)
+    assert status == 200
+    assert "on_leave" in json.loads(body)
+
+
+def test_stream_body_read_on_other_threads(payload):
+    # The executor hands each chunk to whichever thread is free
+    scope = {"method": "POST", "path": "/stream", "headers": [(b"content-type", b"application/x-ndjson")]}
+    environ = wsgi_environ(scope, ndjson_payloads(payload))
+    with ThreadPoolExecutor(1) as start, ThreadPoolExecutor(1) as rest:
+        status, _, chunks = start.submit(call_wsgi, flask_app, environ).result()
+        body = rest.submit(lambda: b"".join(chunks)).result()
+        rest.submit(chunks.close).result()
+    assert status == 200
+    assert len(body.splitlines()) == 3
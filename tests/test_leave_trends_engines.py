@@ -0,0 +1,95 @@
+"""The NumPy leave_trends engine must return exactly what the pandas engine does."""
+import json
+import os
+
+import numpy as np
+import pytest
+
+from function import leave_trends
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def trend_row(date, urgent, planned):
+    total = urgent + planned
+    return {
+        "date": date,
+        "urgent_count": str(urgent),
+        "planned_count": str(planned),
+        "total_leaves": total,
+        "urgent_percentage": f"{100 * urgent / total:.2f}" if total else "0.00",
+        "planned_percentage": f"{100 * planned / total:.2f}" if total else "0.00",
+    }
+
+
+def payload(rows):
+    return {"data": {"plannedUnplannedLeavesTrends": rows}}
+
+
+def dates(days, start="2025-01-01"):
+    return [str(day) for day in np.datetime64(start) + np.arange(days)]
+
+
+CASES = {
+    "one_row": payload([trend_row("2025-03-04", 2, 5)]),
+    "constant_columns": payload([trend_row(date, 3, 3) for date in dates(30)]),
+    "zero_urgent": payload([trend_row(date, 0, day % 4 + 1) for day, date in enumerate(dates(21))]),
+    "unsorted_dates": payload([
+        trend_row(date, day % 3, day % 5 + 1) for day, date in sorted(enumerate(dates(40)), key=lambda row: (row[0] * 7) % 40)
+    ]),
+    "duplicate_dates": payload([
+        trend_row(date, day % 2, day % 3 + 1) for day, date in enumerate(dates(15) + dates(5, "2025-01-03"))
+    ]),
+}
+
+
+def with_gaps(rows, column, every, drop=False):
+    """Nulls (or, with drop, removes) `column` in every `every`-th row."""
+    for i, row in enumerate(rows):
+        if i % every == 0:
+            if drop:
+                del row[column]
+            else:
+                row[column] = None
+    return rows
+
+
+CASES.update({
+    # Rows sharing a date keep the order pandas' (unstable) sort_index gives them
+    "unsorted_duplicate_dates": payload([
+        trend_row(dates(10)[day], urgent, planned)
+        for day, urgent, planned in np.random.default_rng(7).integers([0, 0, 1], [10, 4, 4], size=(40, 3)).tolist()
+    ]),
+    "null_percentage": payload(with_gaps([trend_row(date, day % 3, day % 4 + 1) for day, date in enumerate(dates(20))], "urgent_percentage", 3)),
+    "null_max_percentage": payload(with_gaps([trend_row("2025-01-31", 5, 1)] + [trend_row(date, 1, 3) for date in dates(4, "2025-02-01")], "urgent_percentage", 5)),
+    "missing_field": payload(with_gaps([trend_row(date, day % 2, day % 5 + 1) for day, date in enumerate(dates(25))], "planned_percentage", 4, drop=True)),
+    "null_counts": payload(with_gaps([trend_row(date, day % 4, day % 3 + 1) for day, date in enumerate(dates(30))], "urgent_count", 2)),
+    "one_valid_percentage": payload(with_gaps([trend_row(date, 1, 1) for date in dates(3)], "urgent_percentage", 1)[:2] + [trend_row("2025-01-03", 2, 1)]),
+})
+
+
+def engine_results(data):
+    with np.errstate(all="ignore"):
+        return [json.dumps(leave_trends(data, engine), sort_keys=True) for engine in ("pandas", "numpy")]
+
+
+@pytest.mark.parametrize("case", sorted(CASES))
+def test_engines_agree_on_edge_cases(case):
+    expected, actual = engine_results(CASES[case])
+    assert actual == expected
+
+
+def test_field_missing_from_every_row_fails_in_both_engines():
+    data = payload([{key: value for key, value in trend_row(date, 1, 2).items() if key != "planned_count"} for date in dates(5)])
+    errors = []
+    for engine in ("pandas", "numpy"):
+        with pytest.raises(KeyError) as error:
+            leave_trends(data, engine)
+        errors.append(str(error.value))
+    assert errors[0] == errors[1]
+
+
+def test_engines_agree_on_sample_data():
+    with open(os.path.join(ROOT, "data.json")) as f:
+        expected, actual = engine_results(json.load(f))
+    assert actual == expected
@@ -0,0 +1,102 @@
+"""The SQLite stores shared by worker processes, written to from several processes at once."""
+import multiprocessing
+import random
+import sqlite3
+
+import numpy as np
+
+from function import analyze_counts
+from incremental import AttendanceDataset, DatasetStore
+from rollups import RollupStore
+
+WORKERS = 4
+
+
+def run_workers(target, *args):
+    """Runs target(worker, *args) in forked processes, as a pre-fork server would; returns their results.
+
+    The processes inherit the arguments (stores included) instead of receiving pickled copies.
+    """
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+
+    def run(worker):
+        results.put(target(worker, *args))
+
+    processes = [context.Process(target=run, args=(worker,)) for worker in range(WORKERS)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(60)
+    # Results are small, so the workers can exit before they are read
+    assert [process.exitcode for process in processes] == [0] * WORKERS
+    return [results.get(timeout=5) for _ in processes]
+
+
+def dates(days, start="2025-01-01"):
+    return [str(day) for day in np.datetime64(start) + np.arange(days)]
+
+
+def day_value(label):
+    return int(label[-2:]) % 3
+
+
+def append_days(worker, store, dataset_id, labels):
+    """Every worker tries to append every day, one at a time; returns how many of its appends were accepted."""
+    accepted = 0
+    for label in labels:
+        try:
+            store.append(dataset_id, {"labels": [label], "on_leave": [day_value(label)]})
+            accepted += 1
+        except ValueError:
+            pass
+    return accepted
+
+
+def test_concurrent_dataset_appends_keep_each_day_once(tmp_path):
+    store = DatasetStore(str(tmp_path / "datasets.db"))
+    dataset_id, _ = store.create({"data": {"labels": [], "on_leave": []}})
+    labels = dates(120)
+
+    accepted = run_workers(append_days, store, dataset_id, labels)
+
+    assert sum(accepted) == len(labels)
+    stored = DatasetStore(store.path).get(dataset_id)
+    expected = AttendanceDataset.from_payload({"data": {"labels": labels, "on_leave": [day_value(label) for label in labels]}})
+    assert len(stored) == len(labels)
+    assert stored.analysis() == expected.analysis()
+    # The parent's cached copy is stale and must be reloaded, not served
+    assert len(store.get(dataset_id)) == len(labels)
+
+
+def ingest_windows(worker, store, labels):
+    """Ingests 30 overlapping 40-day windows of random counts; returns how many were ingested."""
+    rng = random.Random(worker)
+    for _ in range(30):
+        start = rng.randrange(len(labels) - 40)
+        window = labels[start:start + 40]
+        store.ingest("h1", {"data": {"labels": window, "on_leave": [rng.randrange(4) for _ in window]}})
+    return 30
+
+
+def test_concurrent_overlapping_rollup_ingests_match_analyze_counts(tmp_path):
+    store = RollupStore(str(tmp_path / "rollups.db"))
+    labels = dates(150, start="2025-01-20")
+
+    assert run_workers(ingest_windows, store, labels) == [30] * WORKERS
+
+    with sqlite3.connect(store.path) as conn:
+        days, values = zip(*conn.execute("SELECT day, value FROM daily WHERE hostel = 'h1' ORDER BY day"))
+    stored = [str(day) for day in np.array(days).astype("datetime64[D]")]
+    # The whole history, then a range whose edges fall inside a week and a month
+    for first, last in [(0, len(stored) - 1), (9, len(stored) - 25)]:
+        expected = analyze_counts(stored[first:last + 1], np.array([values[first:last + 1]]))[0]
+        result = store.query("h1", ["on_leave"], stored[first], stored[last])["on_leave"]
+        statistics = result["basic_statistics"]
+        assert statistics["total"] == expected["basic_statistics"]["total"]
+        assert statistics["active_days"] == expected["basic_statistics"]["active_days"]
+        assert statistics["recorded_days"] == last - first + 1
+        assert statistics["frequency"] == expected["basic_statistics"]["frequency"]
+        assert result["temporal_patterns"]["daily_distribution"] == expected["temporal_patterns"]["daily_distribution"]
+        assert result["temporal_patterns"]["monthly_trend"] == expected["temporal_patterns"]["monthly_trend"]
+        assert sum(result["temporal_patterns"]["weekly_trend"].values()) == expected["basic_statistics"]["total"]